@@ -5,36 +5,333 @@ import os
 from typing import Dict, Any, List, Optional, Tuple
 import logging
 import traceback
-import random
+import time
+import threading
+import heapq
+import hashlib
+import functools
+import itertools
+import atexit
+from operator import itemgetter
+from collections import OrderedDict
+from types import MappingProxyType
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
 from bs4 import BeautifulSoup
-from urllib.parse import quote, urlparse
+from urllib.parse import quote, urlparse, parse_qsl, urlencode, urlunparse
 
 from smolagents import tool, Tool
 from browser_use import Agent, Browser, BrowserConfig
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from dotenv import load_dotenv
 
+try:
+    # orjson is considerably faster at decoding; both raise json.JSONDecodeError subclasses
+    import orjson
+    _json_loads = orjson.loads
+except ModuleNotFoundError:
+    _json_loads = json.loads
+
+try:
+    # lxml builds the soup of a results page several times faster than the pure Python parser
+    from lxml import etree as _lxml_etree
+    HTML_PARSER = 'lxml'
+except ModuleNotFoundError:
+    _lxml_etree = None
+    HTML_PARSER = 'html.parser'
+
+try:
+    # RE2 matches in linear time, so stray backticks in a long LLM response cannot make a search backtrack
+    import re2 as _llm_output_re
+except ModuleNotFoundError:
+    _llm_output_re = re
+
 # Load environment variables
 load_dotenv()
 
 # Get API key from environment or use default
 API_KEY = os.getenv("OPENAI_API_KEY", "")
 
-class LiteratureSearchBrowser:
-    """Browser to search for literature."""
+# Headers sent with every direct HTTP request, set to mimic a browser
+DEFAULT_HEADERS = MappingProxyType({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    # Every compression urllib3 can decode here; Brotli is included when the brotli package is installed
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0'
+})
+
+# Google domains rotated between to spread searches out, with their Books and Scholar variants
+GOOGLE_DOMAINS = (
+    "www.google.com", "www.google.ca", "www.google.fr", "www.google.co.uk", "www.google.de", 
+    "www.google.com.au", "www.google.co.jp", "www.google.co.in", "www.google.com.br", "www.google.ru",
+    "www.google.it", "www.google.es", "www.google.com.mx", "www.google.co.kr", "www.google.nl",
+    "www.google.pl", "www.google.com.sg", "www.google.co.za", "www.google.com.tr", "www.google.se"
+)
+BOOKS_GOOGLE_DOMAINS = tuple(domain.replace("www.", "books.") for domain in GOOGLE_DOMAINS)
+SCHOLAR_GOOGLE_DOMAINS = tuple(domain.replace("www.", "scholar.") for domain in GOOGLE_DOMAINS)
+
+# Google domains named in each browser task: the one the agent starts on, then the ones for its later searches
+GOOGLE_DOMAINS_PER_TASK = 3
+
+# Number of browser instances each LiteratureSearchBrowser keeps for reuse across tasks,
+# enough for the three concurrent literature searches
+BROWSER_POOL_SIZE = 3
+
+# Number of tool results kept in each tool's persistent result cache
+RESULT_CACHE_MAX_ENTRIES = 256
+
+# Near-duplicate queries whose embeddings are at least this similar share cached results
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_EMBEDDING_MODEL = "text-embedding-3-small"
+# Words of a query that must match exactly for a near-duplicate to count: numbers (years, dates) and capitalized names
+QUERY_WORD_PATTERN = re.compile(r"\w+")
+
+# Google SERP response cache settings
+SERP_CACHE_MAX_ENTRIES = 256
+SERP_CACHE_TTL = 3600  # seconds
+
+# (connect, read) timeouts for direct search result requests
+SERP_REQUEST_TIMEOUT = (3.05, 10)
+
+# Keep-alive connection pools for direct requests: hosts kept warm, and connections per host
+HTTP_POOL_HOSTS = 32
+HTTP_POOL_CONNECTIONS_PER_HOST = 4
+
+# Google shows at most this many book match containers per results page
+MAX_BOOK_MATCH_CONTAINERS = 10
+
+# Heading of the book match section on Google results pages, as it appears in the raw UTF-8 HTML
+BOOK_MATCHES_MARKER = "在书中找到匹配结果".encode("utf-8")
+# Bytes of HTML after the heading that are parsed for the book match snippets
+BOOK_MATCHES_WINDOW = 16384
+
+# Patterns for locating and cleaning up book match snippets, compiled once
+VNSPUB_PATTERN = re.compile(rb'class="[^"]*\bVNSPub\b')
+# Any HTML tag, capturing <em> and </em> so they can become markdown bold in the same pass
+HTML_TAG_PATTERN = re.compile(r'(</?em>)|<[^>]*>')
+
+# JSON wrapped in a markdown code block in an LLM response
+JSON_FENCE_PATTERN = _llm_output_re.compile(r'(?s)```(?:json)?\n(.*?)\n```')
+
+# Client-side limits for direct requests to each Google domain, to stay clear of CAPTCHAs
+GOOGLE_REQUESTS_PER_SECOND = 2
+MAX_CONCURRENT_REQUESTS_PER_DOMAIN = 2
+
+
+# Round-robin position in GOOGLE_DOMAINS, shared by all tools and threads
+_google_domain_indices = itertools.cycle(range(len(GOOGLE_DOMAINS)))
+_google_domain_lock = threading.Lock()
+
+def _next_google_domain_indices(count: int) -> List[int]:
+    """Return the indices of the next count Google domains in rotation, all distinct for count <= len(GOOGLE_DOMAINS)."""
+    with _google_domain_lock:
+        return [next(_google_domain_indices) for _ in range(count)]
+
+def _extract_fenced_json(text: str) -> str:
+    """Return the body of the markdown code block an LLM wrapped its JSON in, or the whole text if there is none."""
+    fence = text.find("```")
+    if fence < 0:
+        return text
+    newline = text.find("\n", fence + 3)
+    if newline < 0:
+        return text
+    if text[fence + 3:newline] not in ("", "json"):
+        # The first block is in another language, so look for a later JSON block
+        match = JSON_FENCE_PATTERN.search(text)
+        return match.group(1) if match else text
+    closing = text.find("\n```", newline + 1)
+    if closing < 0:
+        return text
+    return text[newline + 1:closing]
+
+def _parse_llm_json(text: str) -> Any:
+    """Parse JSON an LLM returned, either bare as instructed or wrapped in a markdown code block."""
+    try:
+        # Most responses follow the prompt and are bare JSON, so skip looking for a code block
+        return _json_loads(text)
+    except json.JSONDecodeError:
+        return _json_loads(_extract_fenced_json(text))
+
+@functools.lru_cache(maxsize=None)
+def _render_system_prompt(template: str, download_path: str) -> str:
+    """Fill the download directory into a system prompt template, once per template and directory."""
+    return template.format(download_path=download_path)
+
+def _normalize_search_url(url: str) -> str:
+    """
+    Build a canonical cache key for a search URL.
     
-    def __init__(self, api_key=None, system_prompt=None, download_path=None):
-        """
-        Initialize with OpenAI API key.
-        
-        Args:
-            api_key: OpenAI API key
-            download_path: Path to download PDF files
-        """
-        self.api_key = api_key
-        self.download_path = download_path or "literature_downloads"
-        self.system_prompt = system_prompt or f"""You are ScholarBot, a specialized academic research assistant with the ability to browse the web to find scholarly literature.
+    Lowercases the host and sorts the query-string parameters so that URLs
+    differing only in parameter order map to the same cache entry.
+    """
+    parsed = urlparse(url.strip())
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse(parsed._replace(netloc=parsed.netloc.lower(), query=query, fragment=""))
+
+# Persistent event loop that the synchronous tool entry points submit their coroutines to
+_event_loop = None
+_event_loop_thread = None
+_event_loop_lock = threading.Lock()
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the shared background event loop, starting it on a daemon thread on first use.
+    
+    Browsers and HTTP clients created on this loop stay usable across tool calls,
+    which is not the case with a fresh asyncio.run() loop per call.
+    """
+    global _event_loop, _event_loop_thread
+    with _event_loop_lock:
+        if _event_loop is None or _event_loop.is_closed():
+            _event_loop = asyncio.new_event_loop()
+            _event_loop_thread = threading.Thread(target=_event_loop.run_forever, name="web-tools-event-loop", daemon=True)
+            _event_loop_thread.start()
+        return _event_loop
+
+
+def _run_in_event_loop(coro):
+    """Run a coroutine on the shared background event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+class _ResultCache:
+    """Bounded LRU cache of tool results, persisted as JSON in the tool's download directory."""
+
+    def __init__(self, directory: str, name: str, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.path = os.path.join(directory, f"{name}_results_cache.json")
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def make_key(query: str, *params) -> str:
+        """Build a cache key from the query (case- and whitespace-insensitive) and call parameters."""
+        return json.dumps([" ".join(query.split()).casefold(), *params], ensure_ascii=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            snapshot = dict(self._entries)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not persist result cache to {self.path}: {str(e)}")
+
+def _query_anchor_tokens(query: str) -> frozenset:
+    """Return the words of a query containing a digit or starting with a capital letter."""
+    return frozenset(
+        word for word in QUERY_WORD_PATTERN.findall(query)
+        if word[0].isupper() or any(char.isdigit() for char in word)
+    )
+
+class _SemanticIndex:
+    """Bounded in-memory index of query embeddings, used to find the cached result of a near-duplicate query."""
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Cache key -> (unit-length query embedding, call parameters), oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def find(self, embedding: np.ndarray, *params) -> Optional[str]:
+        """Return the cache key of the most similar query made with the same parameters, if similar enough."""
+        with self._lock:
+            candidates = [(key, vector) for key, (vector, entry_params) in self._entries.items() if entry_params == params]
+        if not candidates:
+            return None
+        similarities = np.stack([vector for _, vector in candidates]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        return candidates[best][0]
+
+    def add(self, key: str, embedding: np.ndarray, *params):
+        with self._lock:
+            self._entries[key] = (embedding, params)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class _RateLimiter:
+    """Caps concurrent requests to one domain and spaces their start times evenly."""
+
+    def __init__(self, requests_per_second: float, max_concurrent_requests: int):
+        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self._interval = 1 / requests_per_second
+        self._next_start = 0.0
+
+    async def acquire(self):
+        """Wait until the next request may start."""
+        now = asyncio.get_running_loop().time()
+        delay = self._next_start - now
+        # Reserve the slot before sleeping so concurrent callers queue up behind it
+        self._next_start = max(now, self._next_start) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# Rules shared by the browser agent system prompts, referenced by section from the task prompts.
+# Formatted together with the system prompt, so {download_path} is filled in there.
+BROWSER_SHARED_RULES = """SHARED RULES:
+§1 GOOGLE DOMAIN ROTATION
+- Each task names the Google domains to use; for EACH new Google search (books, scholar, or regular search), use the next one of them
+- Instead of https://books.google.com/ go to https://books.[domain], instead of https://scholar.google.com/ go to https://scholar.[domain]
+- Wait 5-7 seconds between searches on different Google domains
+
+§2 EXACTMATCH QUESTIONS
+- The complete and precise answer exists verbatim in the literature; finding and preserving the EXACT original wording is ESSENTIAL
+- ALWAYS remove any blanks (like "____", "___", or "[BLANK]") before searching, because texts won't contain these placeholders
+  Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
+- On Google search pages, READ the "在书中找到匹配结果" (matching results found in books) section FIRST:
+  * It looks like <div class="cmlJmd ETWPw"><div class="VNSPub">在书中找到匹配结果</div><span><span>... text content with <em>highlighted parts</em> ...</span></span></div>
+  * Extract the text of the <span> elements that follow the VNSPub div; the <em> parts are the exact matches to your search query
+  * Example: "<em>In 1825</em> the Bourbon regime... In <em>Franche-Comté</em>..." matched "In 1825" and "Franche-Comté"
+- Also check the snippets on every search results page before clicking through
+- If a snippet exactly matches the query (with blanks removed), record it with its source details and STOP SEARCHING - no further searching is needed
+- In the final answer, ADD BACK THE BLANKS filled in with the found words and emphasize them
+  Example: "The Battle of _Waterloo_ was fought in 1815"
+
+§3 PDF DOWNLOADS
+- Download useful, freely accessible PDFs with the browser's download functionality to: {download_path}
+- Do NOT attempt to download files behind paywalls or requiring login
+- Note the filename and location of each downloaded PDF and include it in your report
+
+§4 BROWSER HANDLING
+- Wait 3-5 seconds between page operations (opening tabs, clicking links, performing searches) and after closing a tab
+- CLOSE THE TAB after finishing with each source before moving to the next one
+- Space out your interactions to appear more human-like and avoid triggering anti-bot measures
+
+§5 AUTHENTICATION
+- If you encounter login walls, CAPTCHA verification, paywalls, or any authentication requirements, EXIT that page immediately
+- Do NOT attempt to bypass security measures or enter credentials
+- Note "Authentication required" for that source and move on to freely accessible sources"""
+
+# System prompt for the ScholarBot literature search agent, formatted with the download directory
+SCHOLAR_SYSTEM_PROMPT = """You are ScholarBot, a specialized academic research assistant with the ability to browse the web to find scholarly literature.
 
 Your primary task is finding and retrieving detailed academic content from scholarly sources.
 
@@ -45,117 +342,285 @@ CRITICAL INSTRUCTIONS:
 4. Look specifically for EXACT text matches to the query phrases
 5. When you find matching text, record it VERBATIM with exact wording preserved
 6. Provide page numbers or specific locations where quotes are found
-7. When you find accessible PDF files, DOWNLOAD them to the download directory: {self.download_path}
-8. IMPORTANT: Wait 3-5 seconds between each page operation to avoid being blocked
-
-SEARCH STRATEGY (FOLLOW THIS ORDER):
-FIRST: Search on Google Books:
-- IMPORTANT: Instead of using https://books.google.com/, randomly select a Google domain from the list above
-- For example, try https://books.google.ca/ or https://books.google.fr/ or https://books.google.co.uk/
-- Use a different random domain for each new search session
-- Search for the query using precise keywords
-- For exactMatch questions, ALWAYS remove any blanks (like "____", "___", or "[BLANK]") from the question before searching
-- Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-- This is CRITICAL because scholarly texts won't contain these blank placeholders
-- CRITICALLY IMPORTANT: If your search redirects to a regular Google page (URL starting with https://www.google.com/search?):
-  * Look for a section labeled "在书中找到匹配结果" (matching results found in books)
-  * IMPORTANT: When you see HTML with <div class="VNSPub">在书中找到匹配结果</div>, extract all HTML information that follows this div - this contains the matching results
-  * The content will typically appear in a structure like: <div class="cmlJmd ETWPw"><div class="VNSPub">在书中找到匹配结果</div><span><span>... text content with <em>highlighted parts</em> ...</span></span></div>
-  * Extract the text within the <span> elements that follow the VNSPub div
-  * Pay special attention to text highlighted with <em> tags - these are the exact matches to your search query
-  * For extraction purposes, preserve the <em> tags to identify matched content
-  * For your final answer, you can remove the <em> tags while still emphasizing this matched content
-  * Example: If you see "<em>In 1825</em> the Bourbon regime... In <em>Franche-Comté</em>...", extract this entire text and note that "In 1825" and "Franche-Comté" were highlighted matches
-  * This section contains direct text snippets from books matching your search
-  * READ THESE SNIPPETS CAREFULLY FIRST before anything else
-  * For exactMatch questions, the answer is very likely to be found in these snippets
-  * If you find a matching snippet, record the text and book source immediately
-  * If a snippet perfectly matches the query for an exactMatch question, STOP SEARCHING and return that result
-- IMPORTANT: On the search results page, CAREFULLY CHECK THE SNIPPETS first - if you see a snippet that exactly matches the query:
-  * Read the snippet carefully
-  * If it perfectly matches an exactMatch question (with blanks removed), YOU CAN STOP SEARCHING and immediately return that snippet
-  * Make sure to include the source book details with the snippet
-- Use book previews to locate relevant sections
-- Important: If search results show SNIPPETS that match the query, CLICK on them to see the full context
+7. Follow the SHARED RULES below for every search and page
+
+SEARCH STRATEGY:
+Unless your task names a single source, search Google Books first, then Google Scholar if the results are insufficient, then regular Google Search if the full text is still inaccessible.
+
+GOOGLE BOOKS:
+- Search for keywords from the query, or for the exact wording of exactMatch questions (§2)
+- Check the book match section and the snippets on the results page first (§2)
+- Click on snippets that match the query to see the full context, and use book previews to locate relevant sections
 - When viewing a book, use the SEARCH BOX on the left side panel to search for keywords within that book
-- If Google Books redirects your search to regular Google (URL starting with https://www.google.com/search?q=), this is acceptable - continue with the search
-- When redirected to regular Google, make sure "Books" is selected in the options below the search bar to filter results to book content
-- If the Google Books search is rejected or doesn't work, try searching on regular Google.com instead, then click on the "Books" filter option below the search bar
+- If Google Books redirects to regular Google (https://www.google.com/search?...) or rejects the search, continue on regular Google with the "Books" filter below the search bar selected
 - You don't need the entire book to be accessible - focus on available preview sections or snippets
-- Look for exact quotes or information that matches the query
 - Record exact page numbers whenever possible
-- Wait 3-5 seconds between page operations (clicking links, opening books, performing searches)
-- After finishing with each book, CLOSE THE TAB before moving to the next source
 
-SECOND: If insufficient results from Google Books, search on Google Scholar:
-- IMPORTANT: Instead of using https://scholar.google.com/, randomly select a Google domain from the list above
-- For example, try https://scholar.google.ca/ or https://scholar.google.fr/ or https://scholar.google.co.uk/
-- Use a different random domain than you used for Google Books
+GOOGLE SCHOLAR:
 - Look for academic articles and papers relevant to the query
-- For exactMatch questions, ALWAYS remember to search without any blanks
-- Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-- Always try to access the full text when possible
-- Extract precise quotes and information
-- Wait 3-5 seconds between page operations (opening articles, clicking links)
-- After finishing with each article, CLOSE THE TAB before moving to the next source
-
-THIRD: If full text is inaccessible from both Google Books and Google Scholar:
-- Try a regular Google Search using a random Google domain from the list
-- For example, try https://www.google.ca/ or https://www.google.fr/ or https://www.google.co.uk/
-- Again, use a different random domain than used in previous searches
-- Search for the same concepts plus terms like "quote" "excerpt" or "full text"
-- For exactMatch questions, ALWAYS continue to search without any blanks
-- Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-- Look for educational websites, repositories, or other scholarly sources
-- Check if there are alternative versions of the text on different websites
-- Wait 3-5 seconds between page operations
-- After finishing with each source, CLOSE THE TAB before moving to the next source
-
-BROWSER HANDLING GUIDELINES:
-- Always pause 3-5 seconds between opening new tabs/pages
-- Wait 3-5 seconds after closing a tab before opening a new one
-- Pause a few seconds after performing a search before clicking on results
-- Space out your interactions to appear more human-like and avoid triggering anti-bot measures
+- Always try to access the full text when possible and extract precise quotes
 
-GOOGLE DOMAIN ROTATION:
-- For EACH new Google search (books, scholar, or regular search), randomly select one of these Google domains:
-  www.google.com, www.google.ca, www.google.fr, www.google.co.uk, www.google.de, 
-  www.google.com.au, www.google.co.jp, www.google.co.in, www.google.com.br, www.google.ru,
-  www.google.it, www.google.es, www.google.com.mx, www.google.co.kr, www.google.nl,
-  www.google.pl, www.google.com.sg, www.google.co.za, www.google.com.tr, www.google.se
-- For example, instead of going to https://books.google.com/, go to https://books.[random-domain]
-- Instead of searching on https://scholar.google.com/, use https://scholar.[random-domain]
-- This helps avoid rate limiting or IP blocks from any single Google domain
-- Wait 5-7 seconds between searches on different Google domains
+REGULAR GOOGLE SEARCH:
+- Search for the same concepts plus terms like "quote", "excerpt" or "full text"
+- Look for educational websites, repositories, or other scholarly sources, and for alternative versions of the text on different websites
 
-PDF DOWNLOAD INSTRUCTIONS:
-- When you find freely accessible PDFs, download them using the browser's download functionality
-- Save all PDF files to: {self.download_path}
-- Do NOT attempt to download files behind paywalls or requiring login
-- After downloading, note the filename and location of each downloaded PDF
-- Include the PDF filename in your report for each downloaded article
+""" + BROWSER_SHARED_RULES
 
-AUTHENTICATION HANDLING:
-- If you encounter login walls, CAPTCHA verification, paywalls, or any authentication requirements, EXIT that page immediately
-- Do NOT attempt to bypass security measures or enter credentials
-- Simply note "Authentication required" for that source and try different sources
-- Only spend time on resources that are freely accessible without authentication
-
-HANDLING EXACTMATCH QUESTIONS:
-- For exactMatch type questions, finding and preserving the EXACT original wording is ESSENTIAL
-- The complete and precise answer exists verbatim in the literature and must be found
-- ALWAYS remove any blanks (like "____", "___", or "[BLANK]") from exactMatch questions before searching
-- Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-- This is CRITICAL because texts in scholarly sources won't contain these blank placeholders
-- If you find a snippet on the search results page that exactly matches the query (with blanks removed), immediately return that snippet with its source - no further searching needed
-- For exactMatch questions, ALWAYS check the "在书中找到匹配结果" (matching results found in books) section on Google search pages first
-- IMPORTANT: Look for HTML with <div class="VNSPub">在书中找到匹配结果</div> and extract all information that follows this div
-- CRITICALLY IMPORTANT: When extracting information and forming the final answer, ADD BACK THE BLANKS and fill them in with the correct information
-- Example: If you searched for "The Battle of was fought in 1815" and found "The Battle of Waterloo was fought in 1815", your answer should be "The Battle of Waterloo was fought in 1815" or "The Battle of _Waterloo_ was fought in 1815"
-- Always highlight or emphasize the filled-in information that was originally a blank in the question
-- This is especially important for exactMatch questions - once you've found an exact match, you're done!"""
-        
-    async def _run_task(self, task: str, max_steps: int = 38, download_path: str = None) -> str:
+class LiteratureSearchBrowser:
+    """Browser to search for literature."""
+    
+    def __init__(self, api_key=None, system_prompt=None, download_path=None, pool_size=BROWSER_POOL_SIZE,
+                 max_concurrent_requests=MAX_CONCURRENT_REQUESTS_PER_DOMAIN):
+        """
+        Initialize with OpenAI API key.
+        
+        Args:
+            api_key: OpenAI API key
+            system_prompt: Default system prompt for tasks that do not pass their own
+            download_path: Path to download PDF files
+            pool_size: Number of browsers kept for reuse across tasks
+            max_concurrent_requests: Maximum number of direct requests in flight per Google domain
+        """
+        self.api_key = api_key
+        self.download_path = download_path or "literature_downloads"
+        self.pool_size = pool_size
+        self.max_concurrent_requests = max_concurrent_requests
+        # Download directories already created by this instance
+        self._ensured_paths = set()
+        self._ensure_download_path(self.download_path)
+        # Browsers and the LLM clients are bound to the event loop they were created on
+        self._browser_pool = None
+        # LLM clients per system prompt, each routed to its own OpenAI prompt cache
+        self._llms = {}
+        # LLM client for one-off prompts that do not start with an agent system prompt
+        self._plain_llm = None
+        self._pool_loop = None
+        self._session = requests.Session()
+        self._session.headers.update(DEFAULT_HEADERS)
+        # The default adapter only keeps 10 hosts warm, fewer than the Google domains we rotate through,
+        # so rotating would keep evicting pools and paying for new TLS handshakes
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_HOSTS,
+            pool_maxsize=max(HTTP_POOL_CONNECTIONS_PER_HOST, max_concurrent_requests)
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        # LRU cache of fetched SERPs: normalized URL -> (html_bytes, fetched_at)
+        self._serp_cache = OrderedDict()
+        # SERPs may be fetched from worker threads concurrently
+        self._serp_cache_lock = threading.Lock()
+        # Rate limiters per Google domain, bound to the event loop they were created on
+        self._rate_limiters = {}
+        self._rate_limiter_loop = None
+        self.system_prompt = system_prompt or _render_system_prompt(SCHOLAR_SYSTEM_PROMPT, self.download_path)
+
+    def _fetch_serp(self, url: str, bypass_cache: bool = False, max_containers: Optional[int] = None) -> bytes:
+        """
+        Fetch the raw HTML of a search results page, serving repeated queries from the cache.
+        
+        Args:
+            url: The search results URL
+            bypass_cache: If True, always re-fetch the page and refresh the cache entry
+            max_containers: If set, stream the page and stop downloading once this many
+                book match containers have been received
+            
+        Returns:
+            Raw HTML bytes of the page (possibly truncated when max_containers is set)
+        """
+        cache_key = _normalize_search_url(url)
+        if not bypass_cache:
+            cached = self._get_cached_serp(url, max_containers)
+            if cached is not None:
+                return cached
+        
+        response = self._session.get(url, stream=max_containers is not None, timeout=SERP_REQUEST_TIMEOUT)
+        try:
+            if response.status_code != 200:
+                # Never keep a stale entry around for a URL that is now failing
+                with self._serp_cache_lock:
+                    self._serp_cache.pop(cache_key, None)
+            response.raise_for_status()  # Raise exception for HTTP errors
+            # Only a 200 carries a full results page; 204, 206 or an unfollowed 3xx is served but not cached
+            cacheable = response.status_code == 200
+            
+            if max_containers is None:
+                html, complete = response.content, True
+            else:
+                html, complete = self._read_book_match_containers(response, max_containers)
+        finally:
+            response.close()
+        
+        if not cacheable:
+            return html
+        with self._serp_cache_lock:
+            self._serp_cache[cache_key] = (html, time.time(), complete)
+            self._serp_cache.move_to_end(cache_key)
+            while len(self._serp_cache) > SERP_CACHE_MAX_ENTRIES:
+                self._serp_cache.popitem(last=False)
+        return html
+
+    def _get_cached_serp(self, url: str, max_containers: Optional[int] = None) -> Optional[bytes]:
+        """Return the cached HTML of a search results page, or None if it is missing or expired."""
+        cache_key = _normalize_search_url(url)
+        with self._serp_cache_lock:
+            cached = self._serp_cache.get(cache_key)
+            # Truncated pages are only good enough for callers that would truncate too
+            if (cached and time.time() - cached[1] < SERP_CACHE_TTL
+                    and (cached[2] or max_containers is not None)):
+                self._serp_cache.move_to_end(cache_key)
+                logging.info(f"Using cached search results for: {url}")
+                return cached[0]
+        return None
+
+    def _get_rate_limiter(self, domain: str) -> _RateLimiter:
+        """Return the rate limiter for a domain on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._rate_limiter_loop is not loop:
+            self._rate_limiters = {}
+            self._rate_limiter_loop = loop
+        limiter = self._rate_limiters.get(domain)
+        if limiter is None:
+            limiter = self._rate_limiters[domain] = _RateLimiter(GOOGLE_REQUESTS_PER_SECOND, self.max_concurrent_requests)
+        return limiter
+
+    async def _fetch_serp_async(self, url: str, bypass_cache: bool = False, max_containers: Optional[int] = None) -> bytes:
+        """
+        Fetch a search results page in a worker thread, rate limited per domain.
+        
+        Cached pages are returned without waiting for the rate limiter.
+        
+        Args:
+            url: The search results URL
+            bypass_cache: If True, always re-fetch the page and refresh the cache entry
+            max_containers: If set, stop downloading after this many book match containers
+            
+        Returns:
+            Raw HTML bytes of the page
+        """
+        if not bypass_cache:
+            cached = self._get_cached_serp(url, max_containers)
+            if cached is not None:
+                return cached
+        limiter = self._get_rate_limiter(urlparse(url).netloc)
+        async with limiter.semaphore:
+            await limiter.acquire()
+            return await asyncio.to_thread(self._fetch_serp, url, bypass_cache, max_containers)
+
+    @staticmethod
+    def _read_book_match_containers(response: requests.Response, max_containers: int) -> Tuple[bytes, bool]:
+        """
+        Reads a streamed search results page until max_containers book match containers
+        have been closed, skipping the rest of the page (scripts, ads and footer).
+        
+        The chunks are scanned with lxml's C pull parser; without lxml the page is read
+        whole, since a pure Python scan would cost more than the bytes it saves.
+        
+        Args:
+            response: A response opened with stream=True
+            max_containers: Number of containers after which to stop reading
+            
+        Returns:
+            Tuple of the HTML read so far and whether the whole page was read
+        """
+        if _lxml_etree is None:
+            return response.content, True
+        parser = _lxml_etree.HTMLPullParser(events=('start', 'end'), tag='div')
+        div_depth = 0
+        # Div depths at which the currently open containers started
+        open_containers = []
+        closed_containers = 0
+        chunks = []
+        for chunk in response.iter_content(chunk_size=8192):
+            chunks.append(chunk)
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == 'start':
+                    div_depth += 1
+                    if 'bHexk' in (element.get('class') or '').split():
+                        open_containers.append(div_depth)
+                else:
+                    if open_containers and open_containers[-1] == div_depth:
+                        open_containers.pop()
+                        closed_containers += 1
+                    div_depth -= 1
+            if closed_containers >= max_containers:
+                return b"".join(chunks), False
+        return b"".join(chunks), True
+        
+    def _ensure_download_path(self, path: str):
+        """Create a download directory the first time it is used by this instance."""
+        if path and path not in self._ensured_paths:
+            os.makedirs(path, exist_ok=True)
+            self._ensured_paths.add(path)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        await self.close()
+
+    def _ensure_pool(self):
+        """
+        Create the browser pool for the running event loop.
+        
+        Playwright browsers and the OpenAI HTTP clients cannot be used from a loop other
+        than the one they were created on, so a new pool is built when the loop changes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._pool_loop is loop:
+            return
+        if self._pool_loop is not None:
+            logging.debug("Event loop changed, creating a new browser pool")
+        self._browser_pool = asyncio.Queue()
+        for _ in range(self.pool_size):
+            # Chromium is launched lazily on the first page operation of each browser
+            self._browser_pool.put_nowait(Browser(BrowserConfig(headless=True)))
+        self._llms = {}
+        self._plain_llm = None
+        self._pool_loop = loop
+
+    def _get_llm(self, system_prompt: str) -> ChatOpenAI:
+        """Return the LLM client for agents running with the given system prompt."""
+        llm = self._llms.get(system_prompt)
+        if llm is None:
+            # Route requests sharing this system prompt to the same OpenAI prompt cache, so the
+            # static prefix resent on every agent step is only processed once
+            prompt_cache_key = "browser-agent-" + hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:16]
+            llm = self._llms[system_prompt] = ChatOpenAI(
+                model="gpt-4o",
+                temperature=0,
+                api_key=self.api_key,
+                extra_body={"prompt_cache_key": prompt_cache_key}
+            )
+        return llm
+
+    def _get_plain_llm(self) -> ChatOpenAI:
+        """
+        Return the LLM client for prompts that are not sent with an agent system prompt.
+        
+        It has no prompt_cache_key, so unrelated prefixes never share an agent's prompt cache.
+        Like the agent clients it is bound to the running loop, and rebuilt when the loop changes.
+        """
+        self._ensure_pool()
+        if self._plain_llm is None:
+            self._plain_llm = ChatOpenAI(model="gpt-4o", temperature=0, api_key=self.api_key)
+        return self._plain_llm
+
+    async def close(self):
+        """Close all pooled browsers and the HTTP connections of the session."""
+        if self._browser_pool is not None and self._pool_loop is asyncio.get_running_loop():
+            while not self._browser_pool.empty():
+                browser = self._browser_pool.get_nowait()
+                await browser.close()
+        # The session stays usable and reconnects on its next request
+        self._session.close()
+        self._browser_pool = None
+        self._llms = {}
+        self._plain_llm = None
+        self._pool_loop = None
+
+    async def _run_task(self, task: str, max_steps: int = 38, download_path: str = None, system_prompt: str = None,
+                        max_sources: Optional[int] = None) -> str:
         """
         Run the given task with a browser agent.
         
@@ -163,30 +628,33 @@ HANDLING EXACTMATCH QUESTIONS:
             task: The task to perform
             max_steps: Maximum number of steps the agent can take
             download_path: Path to download PDF files, defaults to self.download_path
+            system_prompt: System prompt extension for the agent, defaults to self.system_prompt
+            max_sources: If set, ask the agent to stop once it can report this many sources
             
         Returns:
             String containing the result of the task
         """
         logging.info(f"Running browser task: {task}")
         download_path = download_path or self.download_path
-        
-        config = BrowserConfig(headless=True)
-        browser = Browser(config)
+        system_prompt = system_prompt or self.system_prompt
+        if max_sources:
+            task += f"\n\nReport at most {max_sources} sources and finish as soon as you have them."
         
         # Ensure download directory exists
-        if download_path and not os.path.exists(download_path):
-            os.makedirs(download_path, exist_ok=True)
-            logging.info(f"Created download directory: {download_path}")
+        self._ensure_download_path(download_path)
         
+        self._ensure_pool()
+        browser_pool = self._browser_pool
+        browser = await browser_pool.get()
         try:
-            llm = ChatOpenAI(model="gpt-4o", temperature=0, api_key=self.api_key)
             # Create a new BrowserAgentBehavior
+            # The agent opens its own context on the pooled browser and closes it when done
             agent = Agent(
                 task=task, 
-                llm=llm, 
-                # browser=browser, 
+                llm=self._get_llm(system_prompt), 
+                browser=browser, 
                 generate_gif=False,
-                extend_system_message=self.system_prompt
+                extend_system_message=system_prompt
             )
             # Run the agent
             result = await agent.run(max_steps=max_steps)
@@ -206,8 +674,126 @@ HANDLING EXACTMATCH QUESTIONS:
             logging.error(error_msg)
             traceback.print_exc()
             return error_msg
+        finally:
+            if self._browser_pool is browser_pool:
+                browser_pool.put_nowait(browser)
+            else:
+                # The pool was closed or replaced while this browser was checked out, so nothing will reuse or close it
+                await browser.close()
+
+    def _parse_book_matches(self, html: bytes) -> List[Dict[str, Any]]:
+        """
+        Parses the book match containers out of a Google search results page.
+        
+        Args:
+            html: Raw HTML of the search results page
+            
+        Returns:
+            List of book matches with their title, heading and content
+        """
+        # Most pages have no book match section at all, so skip building a soup for them
+        if not VNSPUB_PATTERN.search(html) and not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return []
+        
+        # Parse the HTML content
+        soup = BeautifulSoup(html, HTML_PARSER)
+        # print("step3", soup)
+        # Save soup to a test file for debugging
+        # with open("./soup_test_output.html", "w", encoding="utf-8") as f:
+        #     f.write(str(soup))
+        
+        # Find all container elements with class="bHexk Tz5Hvf" as in test.py
+        containers = soup.find_all('div', class_='bHexk Tz5Hvf')
+        
+        # Keep containers that have a title, a VNSPub heading and the content
+        # span following that heading
+        book_matches = [
+            {
+                'title': title_elem.get_text(strip=True),
+                'heading': vnspub_elem.get_text(strip=True),
+                'content': content_span.get_text(strip=False)
+            }
+            for container in containers
+            for title_elem in (container.select_one('h3.LC20lb'),) if title_elem
+            for vnspub_elem in (container.select_one('div.VNSPub'),) if vnspub_elem
+            for content_span in (vnspub_elem.find_next_sibling('span'),) if content_span
+        ]
+        
+        logging.debug(
+            f"Found {len(book_matches)} book matches: "
+            + "; ".join(match['title'] for match in book_matches)
+        )
+        
+        # If no results were found, provide debugging information.
+        # This walks the whole document again, so only do it when debug logging is on.
+        if not book_matches and logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("No matching elements found in the HTML.")
+            
+            # Check if the container class exists at all
+            alt_containers = soup.select('div.bHexk')
+            if alt_containers:
+                logging.debug(f"Found {len(alt_containers)} containers with 'bHexk' in class name.")
+            
+            # Show what classes actually exist for potential containers
+            common_classes = {}
+            for div in soup.find_all('div', class_=True):
+                for class_name in div.get('class', []):
+                    common_classes[class_name] = common_classes.get(class_name, 0) + 1
+            
+            logging.debug("Most common div classes in the document:")
+            for class_name, count in heapq.nlargest(10, common_classes.items(), key=itemgetter(1)):
+                logging.debug(f"  {class_name}: {count} occurrences")
+        
+        return book_matches
 
-    async def extract_book_matches(self, query: str, max_steps: int = 38) -> Tuple[str, List[Dict[str, Any]]]:
+    async def _fetch_and_parse(self, url: str, bypass_cache: bool = False) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Fetches a search results page, rate limited per domain, and parses its book matches.
+        
+        Args:
+            url: The search results URL
+            bypass_cache: If True, re-fetch the page instead of using the cache
+            
+        Returns:
+            Tuple of the URL and the book matches found on the page
+        """
+        html = await self._fetch_serp_async(url, bypass_cache, MAX_BOOK_MATCH_CONTAINERS)
+        return url, self._parse_book_matches(html)
+
+    async def _search_book_matches_concurrently(self, query: str, domain_count: int = 3, bypass_cache: bool = False) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Searches Google Books on the next few Google domains in rotation at once and returns
+        the first page that has book matches, cancelling the remaining requests.
+        
+        Args:
+            query: The search query
+            domain_count: Number of Google domains to query concurrently
+            bypass_cache: If True, re-fetch the pages instead of using the cache
+            
+        Returns:
+            Tuple of the search URL and its book matches, or ("", []) if no domain had any
+        """
+        urls = [
+            f"https://{GOOGLE_DOMAINS[index]}/search?tbm=bks&q={quote(query)}"
+            for index in _next_google_domain_indices(domain_count)
+        ]
+        pending = {asyncio.create_task(self._fetch_and_parse(url, bypass_cache)) for url in urls}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        logging.warning(f"Error fetching book matches: {str(task.exception())}")
+                        continue
+                    url, book_matches = task.result()
+                    if book_matches:
+                        return url, book_matches
+        finally:
+            for task in pending:
+                task.cancel()
+        return "", []
+
+    async def extract_book_matches(self, query: str, max_steps: int = 38, bypass_cache: bool = False) -> Tuple[str, List[Dict[str, Any]]]:
         """
         Extracts book matches from Google Books search by:
         1. Searching Google Books for the query
@@ -218,6 +804,7 @@ HANDLING EXACTMATCH QUESTIONS:
         Args:
             query: The search query
             max_steps: Maximum number of steps the agent can take
+            bypass_cache: If True, re-fetch the search results page instead of using the cache
             
         Returns:
             Tuple containing:
@@ -226,38 +813,11 @@ HANDLING EXACTMATCH QUESTIONS:
         """
         logging.info(f"Extracting book matches for query: {query}")
         
-        # Random Google domain selection for Books search
-        google_domains = [
-            "www.google.com", "www.google.ca", "www.google.fr", "www.google.co.uk", "www.google.de", 
-            "www.google.com.au", "www.google.co.jp", "www.google.co.in", "www.google.com.br"
-        ]
-        
-        books_domain = random.choice(google_domains).replace("www.", "books.")
+        # Next Google domain in rotation for the Books search
+        books_domain = BOOKS_GOOGLE_DOMAINS[_next_google_domain_indices(1)[0]]
         
         # Create a task for browser agent to search Google Books and return the URL
-        search_task = f"""
-        Search for information about "{query}" in Google Books.
-        
-        IMPORTANT: 
-        1. Use {books_domain} instead of books.google.com
-        2. WAIT 3-5 seconds between pages to avoid rate limiting
-        3. Do NOT access login-required content
-        
-        SPECIFIC STEPS:
-        1. Go to {books_domain}
-        2. Search for: "{query}"
-        3. If redirected to a regular Google search page (starting with https://www.google.com/search?), that's okay
-        4. Check if you see the section labeled "在书中找到匹配结果" (matching results found in books)
-        5. COPY THE CURRENT URL and include it in your final report
-        6. VERY IMPORTANT: Do not click on any book results - just get the search results URL
-        Your final response should be a JSON dictionary with the following format:
-        {{
-            "search_url": "https://www.google.com/search?tbm=bks&q=your_query",
-            "book_matches_found": true/false
-        }}
-        
-        Make sure to properly format the JSON so I can parse it directly. Replace true/false with the actual boolean value based on whether the "在书中找到匹配结果" section was visible.
-        """
+        search_task = BOOK_MATCH_SEARCH_TASK_PROMPT.format_map({"query": query, "books_domain": books_domain})
         
         try:
             # Run the browser task to get the search URL
@@ -267,101 +827,34 @@ HANDLING EXACTMATCH QUESTIONS:
                     result = action.extracted_content
                     print("result", result)
                     print("type", type(result))
-                    result = json.loads(result)
+                    result = _json_loads(result)
                     print("result", result)
                     print("type", type(result))
             # Extract URL from the browser result
             # url_pattern = r'URL: (https?://[^\s]+)'
             # url_match = re.search(url_pattern, result["search_url"])
             
-            if not result["book_matches_found"]:
-                return "No URL found in search results", []
-            
-            search_url = result["search_url"]
-            logging.info(f"Found search URL: {search_url}")
-            
-            # Now fetch and parse the HTML from the URL
-            try:
-                # Set headers to mimic a browser
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Cache-Control': 'max-age=0'
-                }
-                # print("step1", search_url)
-                response = requests.get(search_url, headers=headers)
-                response.raise_for_status()  # Raise exception for HTTP errors
-                # print("step2", response.text)
-                # Parse the HTML content
-                soup = BeautifulSoup(response.text, 'html.parser')
-                # print("step3", soup)
-                # Save soup to a test file for debugging
-                # with open("./soup_test_output.html", "w", encoding="utf-8") as f:
-                #     f.write(str(soup))
-                
-                # Find all container elements with class="bHexk Tz5Hvf" as in test.py
-                containers = soup.find_all('div', class_='bHexk Tz5Hvf')
-                
-                book_matches = []
-                for container in containers:
-                    # Try to find the title and content within this container
-                    title_elem = container.find('h3', class_=lambda c: c and 'LC20lb' in c)
-                    vnspub_elem = container.find('div', class_='VNSPub')
-                    
-                    # Only proceed if we found both elements
-                    if title_elem and vnspub_elem:
-                        book_title = title_elem.get_text(strip=True)
-                        
-                        # Find the span after VNSPub that contains the content
-                        content_span = vnspub_elem.find_next_sibling('span')
-                        if content_span:
-                            content_text = content_span.get_text(strip=False)
-                            
-                            # Create book match entry with the same structure as original code
-                            book_match = {
-                                'title': book_title,
-                                'heading': vnspub_elem.get_text(strip=True),
-                                'content': content_text
-                            }
-                            
-                            book_matches.append(book_match)
-                
-                print(f"Found {len(book_matches)} book matches")
-                
-                for result in book_matches:
-                    print(f"\nTitle: {result['title']}")
-                    print(f"Heading: {result['heading']}")
-                    print(f"Content: {result['content']}")
-                    print('-' * 50)
-                
-                # If no results were found, provide debugging information
-                if not book_matches:
-                    print("No matching elements found in the HTML.")
-                    
-                    # Check if the container class exists at all
-                    alt_containers = soup.find_all('div', class_=lambda c: c and 'bHexk' in (c.split() if c else []))
-                    if alt_containers:
-                        print(f"Found {len(alt_containers)} containers with 'bHexk' in class name.")
-                    
-                    # Show what classes actually exist for potential containers
-                    common_classes = {}
-                    for div in soup.find_all('div', class_=True):
-                        for class_name in div.get('class', []):
-                            common_classes[class_name] = common_classes.get(class_name, 0) + 1
-                    
-                    print("\nMost common div classes in the document:")
-                    sorted_classes = sorted(common_classes.items(), key=lambda x: x[1], reverse=True)
-                    for class_name, count in sorted_classes[:10]:  # Top 10 classes
-                        print(f"  {class_name}: {count} occurrences")
-                
-                return search_url, book_matches
+            search_url = ""
+            if result["book_matches_found"]:
+                search_url = result["search_url"]
+                logging.info(f"Found search URL: {search_url}")
                 
-            except Exception as e:
-                logging.error(f"Error parsing HTML: {str(e)}")
-                return search_url, []
+                # Now fetch and parse the HTML from the URL
+                try:
+                    _, book_matches = await self._fetch_and_parse(search_url, bypass_cache=bypass_cache)
+                    if book_matches:
+                        return search_url, book_matches
+                except Exception as e:
+                    logging.error(f"Error parsing HTML: {str(e)}")
+            
+            # Fall back to querying several Google domains directly at the same time
+            fallback_url, book_matches = await self._search_book_matches_concurrently(query, bypass_cache=bypass_cache)
+            if book_matches:
+                return fallback_url, book_matches
+            
+            if not search_url:
+                return "No URL found in search results", []
+            return search_url, []
                 
         except Exception as e:
             error_msg = f"Error extracting book matches: {str(e)}"
@@ -369,12 +862,102 @@ HANDLING EXACTMATCH QUESTIONS:
             traceback.print_exc()
             return "", []
     
-    async def parse_google_books_url(self, url: str) -> List[Dict[str, Any]]:
+    def _build_source_tasks(self, query: str, task_template: str, download_path: str) -> Dict[str, str]:
+        """Build one browser task per search source from the template, each on its own Google domains from the rotation."""
+        indices = _next_google_domain_indices(3 * GOOGLE_DOMAINS_PER_TASK)
+        books_indices, scholar_indices, regular_indices = (
+            indices[start:start + GOOGLE_DOMAINS_PER_TASK] for start in range(0, len(indices), GOOGLE_DOMAINS_PER_TASK)
+        )
+        search_phases = {
+            "Google Books": LITERATURE_BOOKS_PHASE_PROMPT.format(
+                books_domain=BOOKS_GOOGLE_DOMAINS[books_indices[0]],
+                books_domains=", ".join(BOOKS_GOOGLE_DOMAINS[index] for index in books_indices[1:])
+            ),
+            "Google Scholar": LITERATURE_SCHOLAR_PHASE_PROMPT.format(
+                scholar_domain=SCHOLAR_GOOGLE_DOMAINS[scholar_indices[0]],
+                scholar_domains=", ".join(SCHOLAR_GOOGLE_DOMAINS[index] for index in scholar_indices[1:])
+            ),
+            "Google Search": LITERATURE_GENERAL_PHASE_PROMPT.format(
+                regular_domain=GOOGLE_DOMAINS[regular_indices[0]],
+                regular_domains=", ".join(GOOGLE_DOMAINS[index] for index in regular_indices[1:])
+            ),
+        }
+        return {
+            source: task_template.format_map({
+                "query": query,
+                "search_phase": search_phase,
+                "actual_download_path": download_path,
+                "exact_match_marker": EXACT_MATCH_MARKER
+            })
+            for source, search_phase in search_phases.items()
+        }
+
+    async def _search_sources_concurrently(self, query: str, task_template: str, system_prompt: str, max_results: int,
+                                           max_steps: int, download_path: str) -> Tuple[str, bool]:
+        """
+        Search Google Books, Google Scholar and regular Google concurrently and combine the reports.
+        
+        The remaining searches are cancelled as soon as one of them reports an exact match.
+        
+        Args:
+            query: The research query or topic to search for
+            task_template: Task prompt with {query}, {search_phase}, {actual_download_path} and {exact_match_marker} placeholders
+            system_prompt: System prompt extension for the agents
+            max_results: Maximum number of sources each search reports
+            max_steps: Maximum number of steps the agent can take for each source
+            download_path: Path to download PDF files
+            
+        Returns:
+            Tuple of the combined report and whether every search that ran finished successfully
+        """
+        running = {
+            asyncio.create_task(self._run_task(
+                task, max_steps=max_steps, download_path=download_path, system_prompt=system_prompt,
+                max_sources=max_results
+            )): source
+            for source, task in self._build_source_tasks(query, task_template, download_path).items()
+        }
+        results = {}
+        pending = set(running)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                exact_match = False
+                for task in done:
+                    result = results[running[task]] = task.result()
+                    if not isinstance(result, str) and EXACT_MATCH_MARKER in (result.final_result() or ""):
+                        exact_match = True
+                if exact_match:
+                    logging.info("Exact match found, cancelling the remaining literature searches")
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        
+        sections = []
+        complete = True
+        for source in running.values():
+            if source not in results:
+                continue
+            result = results[source]
+            # Error messages come back as plain strings
+            if isinstance(result, str):
+                complete = False
+                sections.append(f"=== {source} ===\n{result}")
+            else:
+                complete = complete and result.is_done()
+                sections.append(f"=== {source} ===\n{result.final_result() or str(result)}")
+        return "\n\n".join(sections), complete
+
+    async def parse_google_books_url(self, url: str, bypass_cache: bool = False) -> List[Dict[str, Any]]:
         """
         Parses the HTML of a Google Books search results page to extract book match snippets.
         
         Args:
             url: The URL of the Google Books search results page
+            bypass_cache: If True, re-fetch the page instead of using the cache
             
         Returns:
             List of book match snippets with their details
@@ -382,21 +965,22 @@ HANDLING EXACTMATCH QUESTIONS:
         logging.info(f"Parsing Google Books URL: {url}")
         
         try:
-            # Set headers to mimic a browser
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Cache-Control': 'max-age=0'
-            }
+            html = await self._fetch_serp_async(url, bypass_cache=bypass_cache)
             
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # Raise exception for HTTP errors
+            marker_index = html.find(BOOK_MATCHES_MARKER)
+            if marker_index < 0:
+                logging.info("No book matches section found")
+                return []
+            
+            # Only decode and parse the section around the heading, starting at its enclosing div
+            section_start = html.rfind(b'cmlJmd', 0, marker_index)
+            section_start = html.rfind(b'<div', 0, section_start) if section_start >= 0 else -1
+            if section_start < 0:
+                section_start = 0
+            section = html[section_start:marker_index + BOOK_MATCHES_WINDOW].decode("utf-8", errors="replace")
             
             # Parse the HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(section, HTML_PARSER)
             
             # Find the book matches section
             book_matches_div = soup.find('div', class_='VNSPub', string='在书中找到匹配结果')
@@ -422,46 +1006,40 @@ HANDLING EXACTMATCH QUESTIONS:
             for span in spans:
                 if 'VNSPub' in span.get('class', []):
                     continue  # Skip the header span
-                    
-                # Get text content with <em> tags preserved
-                snippet_html = str(span)
-                snippet_text = span.get_text()
-                
-                # Extract highlighted parts (text inside <em> tags)
-                em_tags = span.find_all('em')
-                highlights = [em.get_text() for em in em_tags]
                 
                 # Check if this spans contains book title information
-                if span.find('a'):
+                link = span.find('a')
+                if link is not None:
                     # This might be a book title with link
-                    book_link = span.find('a').get('href', '')
-                    book_title = span.find('a').get_text()
+                    book_link = link.get('href', '')
+                    book_title = link.get_text()
                     
-                    # Start a new book match entry
-                    if current_match and 'snippet_html' in current_match:
-                        book_matches.append(current_match)
-                        
+                    # Start a new book match entry; completed entries were already added with their snippet
                     current_match = {
                         'book_title': book_title,
                         'book_link': book_link
                     }
-                elif snippet_text and snippet_text.strip():
+                    continue
+                
+                snippet_text = span.get_text()
+                if snippet_text and snippet_text.strip():
                     # This is a text snippet
-                    if not current_match:
-                        current_match = {}
-                    
-                    current_match['snippet_html'] = snippet_html
+                    # Only serialize the span (with <em> tags preserved) once we know we keep it
+                    current_match['snippet_html'] = str(span)
                     current_match['snippet_text'] = snippet_text
+                    # Extract highlighted parts (text inside <em> tags); a plain-text <em>
+                    # exposes its only string directly, without walking the subtree
+                    highlights = tuple(
+                        str(em.string) if em.string is not None else em.get_text()
+                        for em in span.find_all('em')
+                    )
                     current_match['highlights'] = highlights
+                    # Joined once here so formatting the match never has to re-join
+                    current_match['highlights_text'] = ', '.join(highlights)
                     
-                    # Add to book matches if we have all the key components
-                    if 'snippet_html' in current_match:
-                        book_matches.append(current_match)
-                        current_match = {}
-            
-            # Add the last match if it wasn't added yet
-            if current_match and 'snippet_html' in current_match:
-                book_matches.append(current_match)
+                    # A snippet completes the book match entry
+                    book_matches.append(current_match)
+                    current_match = {}
             
             return book_matches
             
@@ -469,387 +1047,300 @@ HANDLING EXACTMATCH QUESTIONS:
             logging.error(f"Error parsing Google Books URL: {str(e)}")
             return []
 
-class LiteratureSearchingTool(Tool):
-    name = "literature_searching_task"
-    description = "Search for literature and return the most relevant sources for the query."
-    inputs = {
-        "query": {"type": "string", "description": "The research query or topic to search for"},
-        "max_results": {"type": "integer", "description": "Maximum number of sources to return (default 5)", "default": 5, "nullable": True},
-        "max_steps": {"type": "integer", "description": "Maximum number of steps the agent can take", "default": 38, "nullable": True},
-        "download_path": {"type": "string", "description": "Path to download PDF files", "default": "literature_downloads", "nullable": True}
-    }
-    output_type = "string"
-
-    def __init__(self, api_key=None, download_path=None):
-        """
-        Initialize the literature searching tool.
+# Task prompt for LiteratureSearchBrowser.extract_book_matches
+BOOK_MATCH_SEARCH_TASK_PROMPT = """
+        Search for information about "{query}" in Google Books.
         
-        Args:
-            api_key: OpenAI API key
-            download_path: Path to download PDF files
+        IMPORTANT: 
+        1. Use {books_domain} instead of books.google.com
+        2. WAIT 3-5 seconds between pages to avoid rate limiting
+        3. Do NOT access login-required content
+        
+        SPECIFIC STEPS:
+        1. Go to {books_domain}
+        2. Search for: "{query}"
+        3. If redirected to a regular Google search page (starting with https://www.google.com/search?), that's okay
+        4. Check if you see the section labeled "在书中找到匹配结果" (matching results found in books)
+        5. COPY THE CURRENT URL and include it in your final report
+        6. VERY IMPORTANT: Do not click on any book results - just get the search results URL
+        Your final response should be a JSON dictionary with the following format:
+        {{
+            "search_url": "https://www.google.com/search?tbm=bks&q=your_query",
+            "book_matches_found": true/false
+        }}
+        
+        Make sure to properly format the JSON so I can parse it directly. Replace true/false with the actual boolean value based on whether the "在书中找到匹配结果" section was visible.
         """
-        super().__init__()
-        self.download_path = download_path or "literature_downloads"
-        self.system_prompt = f"""You are ScholarBot, a specialized academic research assistant with the ability to browse the web to find scholarly literature.
 
-Your primary task is finding and retrieving detailed academic content from scholarly sources.
+# Browsers shared by all tools created with the same API key, download path and request limit
+_browser_registry: Dict[Tuple[Optional[str], Optional[str], int], LiteratureSearchBrowser] = {}
+_browser_registry_lock = threading.Lock()
 
-CRITICAL INSTRUCTIONS:
-1. ALWAYS click into the actual articles rather than just reading search result snippets
-2. Extract information DIRECTLY from the article pages, not just from search results
-3. You MUST access the full text when available, or at minimum the complete abstract page
-4. Look specifically for EXACT text matches to the query phrases
-5. When you find matching text, record it VERBATIM with exact wording preserved
-6. Provide page numbers or specific locations where quotes are found
-7. When you find accessible PDF files, DOWNLOAD them to the download directory: {self.download_path}
-8. IMPORTANT: Wait 3-5 seconds between each page operation to avoid being blocked
-
-SEARCH STRATEGY (FOLLOW THIS ORDER):
-FIRST: Search on Google Books:
-- IMPORTANT: Instead of using https://books.google.com/, randomly select a Google domain from the list above
-- For example, try https://books.google.ca/ or https://books.google.fr/ or https://books.google.co.uk/
-- Use a different random domain for each new search session
-- Search for the query using precise keywords
-- For exactMatch questions, ALWAYS remove any blanks (like "____", "___", or "[BLANK]") from the question before searching
-- Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-- This is CRITICAL because scholarly texts won't contain these blank placeholders
-- CRITICALLY IMPORTANT: If your search redirects to a regular Google page (URL starting with https://www.google.com/search?):
-  * Look for a section labeled "在书中找到匹配结果" (matching results found in books)
-  * IMPORTANT: When you see HTML with <div class="VNSPub">在书中找到匹配结果</div>, extract all HTML information that follows this div - this contains the matching results
-  * The content will typically appear in a structure like: <div class="cmlJmd ETWPw"><div class="VNSPub">在书中找到匹配结果</div><span><span>... text content with <em>highlighted parts</em> ...</span></span></div>
-  * Extract the text within the <span> elements that follow the VNSPub div
-  * Pay special attention to text highlighted with <em> tags - these are the exact matches to your search query
-  * For extraction purposes, preserve the <em> tags to identify matched content
-  * For your final answer, you can remove the <em> tags while still emphasizing this matched content
-  * Example: If you see "<em>In 1825</em> the Bourbon regime... In <em>Franche-Comté</em>...", extract this entire text and note that "In 1825" and "Franche-Comté" were highlighted matches
-  * This section contains direct text snippets from books matching your search
-  * READ THESE SNIPPETS CAREFULLY FIRST before anything else
-  * For exactMatch questions, the answer is very likely to be found in these snippets
-  * If you find a matching snippet, record the text and book source immediately
-  * If a snippet perfectly matches the query for an exactMatch question, STOP SEARCHING and return that result
-- IMPORTANT: On the search results page, CAREFULLY CHECK THE SNIPPETS first - if you see a snippet that exactly matches the query:
-  * Read the snippet carefully
-  * If it perfectly matches an exactMatch question (with blanks removed), YOU CAN STOP SEARCHING and immediately return that snippet
-  * Make sure to include the source book details with the snippet
-- Use book previews to locate relevant sections
-- Important: If search results show SNIPPETS that match the query, CLICK on them to see the full context
-- When viewing a book, use the SEARCH BOX on the left side panel to search for keywords within that book
-- If Google Books redirects your search to regular Google (URL starting with https://www.google.com/search?q=), this is acceptable - continue with the search
-- When redirected to regular Google, make sure "Books" is selected in the options below the search bar to filter results to book content
-- If the Google Books search is rejected or doesn't work, try searching on regular Google.com instead, then click on the "Books" filter option below the search bar
-- You don't need the entire book to be accessible - focus on available preview sections or snippets
-- Look for exact quotes or information that matches the query
-- Record exact page numbers whenever possible
-- Wait 3-5 seconds between page operations (clicking links, opening books, performing searches)
-- After finishing with each book, CLOSE THE TAB before moving to the next source
+def _get_browser(api_key: Optional[str] = None, download_path: Optional[str] = None,
+                 max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS_PER_DOMAIN) -> LiteratureSearchBrowser:
+    """Return the shared LiteratureSearchBrowser for these settings, creating it if needed."""
+    key = (api_key, download_path, max_concurrent_requests)
+    with _browser_registry_lock:
+        browser = _browser_registry.get(key)
+        if browser is None:
+            browser = _browser_registry[key] = LiteratureSearchBrowser(
+                api_key=api_key,
+                download_path=download_path,
+                max_concurrent_requests=max_concurrent_requests
+            )
+        return browser
 
-SECOND: If insufficient results from Google Books, search on Google Scholar:
-- IMPORTANT: Instead of using https://scholar.google.com/, randomly select a Google domain from the list above
-- For example, try https://scholar.google.ca/ or https://scholar.google.fr/ or https://scholar.google.co.uk/
-- Use a different random domain than you used for Google Books
-- Look for academic articles and papers relevant to the query
-- For exactMatch questions, ALWAYS remember to search without any blanks
-- Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-- Always try to access the full text when possible
-- Extract precise quotes and information
-- Wait 3-5 seconds between page operations (opening articles, clicking links)
-- After finishing with each article, CLOSE THE TAB before moving to the next source
-
-THIRD: If full text is inaccessible from both Google Books and Google Scholar:
-- Try a regular Google Search using a random Google domain from the list
-- For example, try https://www.google.ca/ or https://www.google.fr/ or https://www.google.co.uk/
-- Again, use a different random domain than used in previous searches
-- Search for the same concepts plus terms like "quote" "excerpt" or "full text"
-- For exactMatch questions, ALWAYS continue to search without any blanks
-- Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-- Look for educational websites, repositories, or other scholarly sources
-- Check if there are alternative versions of the text on different websites
-- Wait 3-5 seconds between page operations
-- After finishing with each source, CLOSE THE TAB before moving to the next source
-
-BROWSER HANDLING GUIDELINES:
-- Always pause 3-5 seconds between opening new tabs/pages
-- Wait 3-5 seconds after closing a tab before opening a new one
-- Pause a few seconds after performing a search before clicking on results
-- Space out your interactions to appear more human-like and avoid triggering anti-bot measures
+def close_all_browsers():
+    """Close the browsers of every shared LiteratureSearchBrowser."""
+    with _browser_registry_lock:
+        browsers = list(_browser_registry.values())
+    for browser in browsers:
+        _run_in_event_loop(browser.close())
 
-GOOGLE DOMAIN ROTATION:
-- For EACH new Google search (books, scholar, or regular search), randomly select one of these Google domains:
-  www.google.com, www.google.ca, www.google.fr, www.google.co.uk, www.google.de, 
-  www.google.com.au, www.google.co.jp, www.google.co.in, www.google.com.br, www.google.ru,
-  www.google.it, www.google.es, www.google.com.mx, www.google.co.kr, www.google.nl,
-  www.google.pl, www.google.com.sg, www.google.co.za, www.google.com.tr, www.google.se
-- For example, instead of going to https://books.google.com/, go to https://books.[random-domain]
-- Instead of searching on https://scholar.google.com/, use https://scholar.[random-domain]
-- This helps avoid rate limiting or IP blocks from any single Google domain
-- Wait 5-7 seconds between searches on different Google domains
+# Seconds the exit hook waits for the pooled browsers to close before giving up
+BROWSER_CLOSE_AT_EXIT_TIMEOUT = 10
+
+def _close_all_browsers_at_exit():
+    """
+    Close the pooled browsers when the interpreter exits.
+    
+    Unlike close_all_browsers, this never starts the event loop thread: if it is not
+    running, or no browser pool was ever created, there is nothing to close.
+    """
+    with _event_loop_lock:
+        loop, thread = _event_loop, _event_loop_thread
+    if loop is None or loop.is_closed() or thread is None or not thread.is_alive():
+        return
+    with _browser_registry_lock:
+        browsers = [browser for browser in _browser_registry.values() if browser._browser_pool is not None]
+    if not browsers:
+        return
+    
+    async def close_browsers():
+        await asyncio.gather(*(browser.close() for browser in browsers), return_exceptions=True)
+    
+    future = asyncio.run_coroutine_threadsafe(close_browsers(), loop)
+    try:
+        future.result(timeout=BROWSER_CLOSE_AT_EXIT_TIMEOUT)
+    except Exception as e:
+        future.cancel()
+        logging.warning(f"Could not close browsers at exit: {str(e)}")
+
+atexit.register(_close_all_browsers_at_exit)
+
+# Marker the literature search agent starts its answer with once a snippet matches an exactMatch query
+EXACT_MATCH_MARKER = "EXACT MATCH FOUND"
+
+# Blank placeholders that mark a query as an exactMatch question
+BLANK_PLACEHOLDER_PATTERN = re.compile(r"_{2,}|\[BLANK\]")
+
+# Browser agent step budgets for LiteratureSearchingTool, picked from the shape of the query
+DEFAULT_MAX_STEPS = 38
+SHORT_QUERY_MAX_STEPS = 16
+EXACT_MATCH_MAX_STEPS = 8
+SHORT_QUERY_WORDS = 6
+
+def _estimate_max_steps(query: str) -> int:
+    """Return the step budget for a query: exactMatch questions and short factoid queries need fewer steps."""
+    if BLANK_PLACEHOLDER_PATTERN.search(query):
+        return EXACT_MATCH_MAX_STEPS
+    if len(query.split()) < SHORT_QUERY_WORDS:
+        return SHORT_QUERY_MAX_STEPS
+    return DEFAULT_MAX_STEPS
+
+# Per-source search instructions for LiteratureSearchingTool.forward, which searches all three
+# sources concurrently and inserts each one into LITERATURE_SEARCH_TASK_PROMPT
+LITERATURE_BOOKS_PHASE_PROMPT = """SEARCH SOURCE: Google Books, following the GOOGLE BOOKS guidelines
+        - Start on {books_domain}; for further searches use, in turn (§1): {books_domains}"""
+
+LITERATURE_SCHOLAR_PHASE_PROMPT = """SEARCH SOURCE: Google Scholar, following the GOOGLE SCHOLAR guidelines
+        - Start on {scholar_domain}; for further searches use, in turn (§1): {scholar_domains}"""
+
+LITERATURE_GENERAL_PHASE_PROMPT = """SEARCH SOURCE: regular Google Search, following the REGULAR GOOGLE SEARCH guidelines
+        - Start on {regular_domain}; for further searches use, in turn (§1): {regular_domains}"""
+
+# Task prompt for LiteratureSearchingTool.forward, formatted once per search source
+LITERATURE_SEARCH_TASK_PROMPT = """
+        As a scholarly research assistant, search for relevant academic literature about: {query}
+        
+        Other assistants are searching the remaining sources in parallel, so ONLY search the source below. Follow the SHARED RULES from your instructions.
+        
+        {search_phase}
+        
+        You MUST click into each article to read the full text or detailed abstract. Do not just rely on the search results page summaries.
+        Download PDFs (§3) to this specific directory: {actual_download_path}
+        
+        For each source you access, document:
+        - Full citation details (authors, title, journal/book, year, DOI/ISBN)
+        - Direct URL to the source
+        - Citation count and publication year (when available)
+        - EXACT QUOTES from the text that match or directly relate to the query
+        - Full abstract/summary (copy the complete text)
+        - Methodology used (if available)
+        - Key findings and conclusions (with page numbers when possible)
+        - Downloaded PDF filename (if available and successfully downloaded)
+        
+        Prioritize sources where:
+        1. You can access the full text content
+        2. The content contains EXACT matches to query phrases (highest priority)
+        3. The content is highly cited from reputable sources
+        4. The information is recently published (unless historical sources are needed)
+        
+        If you stop searching because a snippet exactly matches an exactMatch question (§2), start your answer with "{exact_match_marker}".
+        
+        Format your response as a detailed research summary with bibliographic information and content details organized by source. Include sections on methodology, findings, and exact quotes that match the query.
+        """
+
+class LiteratureSearchingTool(Tool):
+    name = "literature_searching_task"
+    description = "Search for literature and return the most relevant sources for the query."
+    inputs = {
+        "query": {"type": "string", "description": "The research query or topic to search for"},
+        "max_results": {"type": "integer", "description": "Maximum number of sources to return (default 5)", "default": 5, "nullable": True},
+        "max_steps": {"type": "integer", "description": "Maximum number of steps the agent can take", "default": 38, "nullable": True},
+        "download_path": {"type": "string", "description": "Path to download PDF files", "default": "literature_downloads", "nullable": True}
+    }
+    output_type = "string"
 
-PDF DOWNLOAD INSTRUCTIONS:
-- When you find freely accessible PDFs, download them using the browser's download functionality
-- Save all PDF files to: {self.download_path}
-- Do NOT attempt to download files behind paywalls or requiring login
-- After downloading, note the filename and location of each downloaded PDF
-- Include the PDF filename in your report for each downloaded article
+    def __init__(self, api_key=None, download_path=None, max_concurrent_requests=MAX_CONCURRENT_REQUESTS_PER_DOMAIN):
+        """
+        Initialize the literature searching tool.
+        
+        Args:
+            api_key: OpenAI API key
+            download_path: Path to download PDF files
+            max_concurrent_requests: Maximum number of direct Google requests in flight per domain
+        """
+        super().__init__()
+        self.download_path = download_path or "literature_downloads"
+        self.system_prompt = _render_system_prompt(SCHOLAR_SYSTEM_PROMPT, self.download_path)
+        # The browser is looked up on first use, so registered but unused tools stay cheap
+        self._browser_kwargs = dict(
+            api_key=api_key, download_path=download_path, max_concurrent_requests=max_concurrent_requests
+        )
+        self._result_cache = _ResultCache(self.download_path, self.name)
 
-AUTHENTICATION HANDLING:
-- If you encounter login walls, CAPTCHA verification, paywalls, or any authentication requirements, EXIT that page immediately
-- Do NOT attempt to bypass security measures or enter credentials
-- Simply note "Authentication required" for that source and try different sources
-- Only spend time on resources that are freely accessible without authentication
-
-HANDLING EXACTMATCH QUESTIONS:
-- For exactMatch type questions, finding and preserving the EXACT original wording is ESSENTIAL
-- The complete and precise answer exists verbatim in the literature and must be found
-- ALWAYS remove any blanks (like "____", "___", or "[BLANK]") from exactMatch questions before searching
-- Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-- This is CRITICAL because texts in scholarly sources won't contain these blank placeholders
-- If you find a snippet on the search results page that exactly matches the query (with blanks removed), immediately return that snippet with its source - no further searching needed
-- For exactMatch questions, ALWAYS check the "在书中找到匹配结果" (matching results found in books) section on Google search pages first
-- IMPORTANT: Look for HTML with <div class="VNSPub">在书中找到匹配结果</div> and extract all information that follows this div
-- CRITICALLY IMPORTANT: When extracting information and forming the final answer, ADD BACK THE BLANKS and fill them in with the correct information
-- Example: If you searched for "The Battle of was fought in 1815" and found "The Battle of Waterloo was fought in 1815", your answer should be "The Battle of Waterloo was fought in 1815" or "The Battle of _Waterloo_ was fought in 1815"
-- Always highlight or emphasize the filled-in information that was originally a blank in the question
-- This is especially important for exactMatch questions - once you've found an exact match, you're done!"""
-        self.browser = LiteratureSearchBrowser(api_key=api_key, system_prompt=self.system_prompt, download_path=download_path)
+    @property
+    def browser(self) -> LiteratureSearchBrowser:
+        """The shared LiteratureSearchBrowser running this tool's tasks, looked up on first access."""
+        browser = self.__dict__.get("_browser")
+        if browser is None:
+            browser = self._browser = _get_browser(**self._browser_kwargs)
+        return browser
 
-    async def _literature_searching_task(self, query: str, max_results: int = 5) -> str:
+    async def _try_exact_match_fastpath(self, query: str) -> Optional[str]:
         """
-        Search for literature and return the most relevant sources for the query.
+        Look up an exactMatch query directly in the Google Books book match snippets.
         
         Args:
-            query: The research query or topic to search for
-            max_results: Maximum number of sources to return (default 5)
+            query: The research query, with blanks such as "____" or "[BLANK]"
             
         Returns:
-            String containing the most relevant literature with explanations
+            The matching snippets in the literature search report format, or None if the
+            query has no blanks or no snippet contains all of its text around the blanks
         """
-        google_domains = [
-            "www.google.com", "www.google.ca", "www.google.fr", "www.google.co.uk", "www.google.de", 
-            "www.google.com.au", "www.google.co.jp", "www.google.co.in", "www.google.com.br", "www.google.ru",
-            "www.google.it", "www.google.es", "www.google.com.mx", "www.google.co.kr", "www.google.nl"
+        fragments = [
+            " ".join(fragment.split()).casefold()
+            for fragment in BLANK_PLACEHOLDER_PATTERN.split(query)
         ]
-        
-        scholar_domain = random.choice(google_domains).replace("www.", "scholar.")
-        
-        restricted_task = f"""Search for {max_results} high-impact, recent scholarly articles about: {query}. 
-        
-        IMPORTANT: Instead of using scholar.google.com, use {scholar_domain}
-        This helps avoid rate limiting and detection by search engines.
-        Wait 5-7 seconds between searches on different domains.
-        
-        Prioritize:
-        1. Most related articles
-        2. Highly cited papers (preferably in the top percentile of citations for their publication year)
-        3. Recent publications (preferably within the last 3-5 years)
-        4. Papers published in reputable journals or conferences
-        5. Research from established institutions or authors
-        6. Review papers and meta-analyses when appropriate
-        
-        For each recommended paper, include:
-        - Full citation
-        - Citation count
-        - Publication year
-        - Brief description of key findings
-        
-        Sort results by relevance and citation impact. Return exactly {max_results} articles if possible. Do NOT access login-required sites or paywalled content."""
+        if len(fragments) < 2:
+            return None
+        fragments = [fragment for fragment in fragments if fragment]
+        search_query = " ".join(fragments)
         
         try:
-            # Run the task with BrowserAgentBehavior
-            result = asyncio.run(self.browser._run_task(
-                restricted_task, 
-                max_steps=38, 
-                download_path=self.download_path
-            ))
-            return result or "No literature found."
+            search_url, book_matches = await self.browser._search_book_matches_concurrently(search_query)
         except Exception as e:
-            error_msg = f"Error searching literature: {str(e)}"
-            logging.error(error_msg)
-            return error_msg
+            logging.warning(f"Exact match lookup failed: {str(e)}")
+            return None
+        
+        exact_matches = [
+            match for match in book_matches
+            if all(fragment in " ".join(match['content'].split()).casefold() for fragment in fragments)
+        ]
+        if not exact_matches:
+            return None
+        
+        logging.info(f"Found {len(exact_matches)} exact book matches for query: {query}")
+        report = [f"=== Google Books ===\n{EXACT_MATCH_MARKER}\n\nSearch URL: {search_url}\n"]
+        for i, match in enumerate(exact_matches, 1):
+            report.append(f"### Match {i}:\n**Book**: {match['title']}\n**Snippet**: {match['content']}\n")
+        return "\n".join(report)
 
-    def forward(self, query: str, max_results: int = 5, max_steps: int = 38, download_path: str = None) -> str:
+    async def _run_literature_search(self, query: str, max_results: int = 5, max_steps: int = 38, download_path: str = None) -> str:
         """
         Search for literature and return the most relevant sources for the query.
         
         Args:
             query: The research query or topic to search for
             max_results: Maximum number of sources to return (default 5)
-            max_steps: Maximum number of steps the agent can take
+            max_steps: Maximum number of steps the agent can take, estimated from the query when left at the default
             download_path: Path to download PDF files
             
         Returns:
             String containing the most relevant literature with explanations
         """
-        logging.info(f"Searching literature for query: {query}")
+        logging.info("Searching literature for query: %s", query)
         actual_download_path = download_path or self.download_path
-        
-        google_domains = [
-            "www.google.com", "www.google.ca", "www.google.fr", "www.google.co.uk", "www.google.de", 
-            "www.google.com.au", "www.google.co.jp", "www.google.co.in", "www.google.com.br", "www.google.ru",
-            "www.google.it", "www.google.es", "www.google.com.mx", "www.google.co.kr", "www.google.nl"
-        ]
-        
-        # Randomly select domains for each service
-        books_domain = random.choice(google_domains).replace("www.", "books.")
-        scholar_domain = random.choice([d for d in google_domains if d != books_domain.replace("books.", "www.")]).replace("www.", "scholar.")
-        regular_domain = random.choice([d for d in google_domains if d != books_domain.replace("books.", "www.") and d != scholar_domain.replace("scholar.", "www.")])
-        
-        restricted_task = f"""
-        As a scholarly research assistant, search for relevant academic literature about: {query}
-        
-        CRITICAL INSTRUCTION: You MUST click into each article to read the full text or detailed abstract. Do not just rely on the search results page summaries.
-        
-        FOLLOW THIS SEARCH STRATEGY IN ORDER:
-        
-        STEP 1: Begin with Google Books
-        - IMPORTANT: Instead of using books.google.com, use {books_domain}
-        - If you need to do another search, randomly select from these Google domains:
-          books.google.com, books.google.ca, books.google.fr, books.google.co.uk, books.google.de, 
-          books.google.com.au, books.google.co.jp, books.google.co.in, books.google.com.br
-        - Use a different domain for each search to avoid rate limiting
-        - Wait 5-7 seconds between searches on different domains
-        - If it is not an exact match question, search for keywords directly from the query. If it is an exact match question, search for the exact wording of the query.
-        - For exactMatch questions, ALWAYS remove any blanks (like "____" or "[BLANK]") from the question before searching
-        - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-        - CRITICALLY IMPORTANT: If your search redirects to a regular Google page (URL starting with https://www.google.com/search?):
-          * Look for a section labeled "在书中找到匹配结果" (matching results found in books)
-          * IMPORTANT: When you see HTML with <div class="VNSPub">在书中找到匹配结果</div>, extract all HTML information that follows this div - this contains the matching results
-          * The content will typically appear in a structure like: <div class="cmlJmd ETWPw"><div class="VNSPub">在书中找到匹配结果</div><span><span>... text content with <em>highlighted parts</em> ...</span></span></div>
-          * Extract the text within the <span> elements that follow the VNSPub div
-          * Pay special attention to text highlighted with <em> tags - these are the exact matches to your search query
-          * For extraction purposes, preserve the <em> tags to identify matched content
-          * For your final answer, you can remove the <em> tags while still emphasizing this matched content
-          * Example: If you see "<em>In 1825</em> the Bourbon regime... In <em>Franche-Comté</em>...", extract this entire text and note that "In 1825" and "Franche-Comté" were highlighted matches
-          * This section contains direct text snippets from books matching your search
-          * READ THESE SNIPPETS CAREFULLY FIRST before anything else
-          * For exactMatch questions, the answer is very likely to be found in these snippets
-          * If you find a matching snippet, record the text and book source immediately
-          * If a snippet perfectly matches the query for an exactMatch question, STOP SEARCHING and return that result
-        - IMPORTANT: On the Google Books search results page, CAREFULLY CHECK THE SNIPPETS first:
-          * Read each snippet on the search results page carefully
-          * If a snippet perfectly matches the query (with blanks removed for exactMatch questions), YOU CAN STOP SEARCHING
-          * Simply record that snippet along with its source book details and return it immediately
-          * For exactMatch questions, once you've found an exact match in a snippet, no further searching is needed
-        - Find books with preview access that discuss the topic
-        - Use the search/preview feature to locate relevant sections
-        - Important: If search results show SNIPPETS that match the query, CLICK on them to see the full context
-        - When viewing a book, use the SEARCH BOX on the left side panel to search for keywords within that book
-        - If Google Books redirects your search to regular Google (URL starting with https://www.google.com/search?q=), this is acceptable - continue with the search
-        - When redirected to regular Google, make sure "Books" is selected in the options below the search bar to filter results to book content
-        - If the Google Books search is rejected or doesn't work, try searching on regular Google.com instead, then click on the "Books" filter option below the search bar
-        - You don't need the entire book to be accessible - focus on available preview sections or snippets
-        - Record exact page numbers whenever possible
-        - Wait 3-5 seconds between page operations (clicking links, opening books, performing searches)
-        - After finishing with each book, CLOSE THE TAB before moving to the next source
-        
-        STEP 2: If insufficient results from Google Books, search on Google Scholar
-        - IMPORTANT: Instead of using scholar.google.com, randomly select from these Google domains:
-          scholar.google.com, scholar.google.ca, scholar.google.fr, scholar.google.co.uk, scholar.google.de, 
-          scholar.google.com.au, scholar.google.co.jp, scholar.google.co.in, scholar.google.com.br, scholar.google.it,
-          scholar.google.es, scholar.google.com.mx, scholar.google.co.kr, scholar.google.nl
-        - Use a different domain than you used for Google Books
-        - Wait 5-7 seconds between searches on different domains
-        - Search for relevant articles using keywords from the query
-        - For exactMatch questions, ALWAYS remember to search without any blanks
-        - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815" 
-        - This is CRITICAL because scholarly texts won't contain these blank placeholders
-        - Always try to access the full text when possible
-        - Extract precise quotes and information
-        - Wait 3-5 seconds between page operations (opening articles, clicking links)
-        - After finishing with each article, CLOSE THE TAB before moving to the next source
-        
-        STEP 3: If full text is inaccessible from both Google Books and Google Scholar:
-        - Try a regular Google Search using {regular_domain}
-        - If you need to do another search, randomly select from these Google domains:
-          www.google.com, www.google.ca, www.google.fr, www.google.co.uk, www.google.de, 
-          www.google.com.au, www.google.co.jp, www.google.co.in, www.google.com.br
-        - Use a different domain than you used in previous searches
-        - Wait 5-7 seconds between searches on different domains
-        - Search for the same concepts plus terms like "quote", "excerpt", or "full text"
-        - For exactMatch questions, ALWAYS continue to search without any blanks
-        - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-        - This is ESSENTIAL because web texts won't contain these blank placeholders
-        - Look for educational websites, repositories, or other scholarly sources
-        - Check if there are alternative versions of the text on different platforms
-        - Wait 3-5 seconds between page operations
-        - After finishing with each source, CLOSE THE TAB before moving to the next source
-        
-        For each source you access, document:
-        - Full citation details (authors, title, journal/book, year, DOI/ISBN)
-        - Direct URL to the source
-        - Citation count and publication year (when available)
-        - EXACT QUOTES from the text that match or directly relate to the query
-        - Full abstract/summary (copy the complete text)
-        - Methodology used (if available)
-        - Key findings and conclusions (with page numbers when possible)
-        - Downloaded PDF filename (if available and successfully downloaded)
-        
-        PDF DOWNLOAD INSTRUCTIONS:
-        - When you find freely accessible PDFs, download them to this specific directory: {actual_download_path}
-        - Do NOT attempt to download files behind paywalls or requiring login
-        - After downloading, note the filename and specific location of each downloaded PDF
-        - Include the PDF filename in your report for each downloaded article
-        
-        IMPORTANT HANDLING INSTRUCTIONS:
-        - If you encounter any login walls, CAPTCHA verification, paywalls, or other authentication requirements, EXIT that page immediately and follow the alternative search steps above
-        - Do NOT attempt to bypass any security measures or authentication systems
-        - Simply note "Authentication required" for that source and move on to other accessible sources or alternative search methods
-        - Focus your time on resources that are freely accessible without login requirements
-        
-        Prioritize sources where:
-        1. You can access the full text content
-        2. The content contains EXACT matches to query phrases (highest priority)
-        3. The content is highly cited from reputable sources
-        4. The information is recently published (unless historical sources are needed)
-        
-        IMPORTANT: For 'exactMatch' type questions, you MUST find the exact original wording in the scholarly literature. The full answer will be contained verbatim in one or more sources - you need to access the content to find it.
-        - If you find a snippet that exactly matches the query (with blanks removed) in the "在书中找到匹配结果" section, STOP SEARCHING and return that immediately
-        - IMPORTANT: To find this section, look for HTML with <div class="VNSPub">在书中找到匹配结果</div> and extract all information that follows this div
-        - The content will typically appear in a structure like: <div class="cmlJmd ETWPw"><div class="VNSPub">在书中找到匹配结果</div><span><span>... text content with <em>highlighted parts</em> ...</span></span></div>
-        - Extract the text within the <span> elements that follow the VNSPub div
-        - The <em> tags highlight the exact matches to your search query - these are the most important parts to focus on
-        - When presenting your findings, you can remove the <em> tags but be sure to emphasize those matched terms
-        - CRITICALLY IMPORTANT FOR FINAL ANSWER: When extracting information and presenting results, ADD BACK THE BLANKS and fill them in with the correct information
-        - Example: If you searched for "The Battle of was fought in 1815" and found "The Battle of Waterloo was fought in 1815", your final answer should be "The Battle of _Waterloo_ was fought in 1815"
-        - Always highlight or emphasize the filled-in information that was originally a blank in the question
-        
-        Format your response as a detailed research summary with bibliographic information and content details organized by source. Include sections on methodology, findings, and exact quotes that match the query.
-        """
+        max_results = max_results or 5
+        if max_steps in (None, DEFAULT_MAX_STEPS):
+            max_steps = _estimate_max_steps(query)
+        
+        # Downloads requested into a different directory need a fresh run
+        use_cache = actual_download_path == self.download_path
+        cache_key = _ResultCache.make_key(query, max_results)
+        if use_cache:
+            cached_result = self._result_cache.get(cache_key)
+            if cached_result is not None:
+                logging.info("Using cached literature search results for query: %s", query)
+                return cached_result
+        
+        # Snippets that already contain the whole exactMatch sentence make the browser search unnecessary
+        exact_match = await self._try_exact_match_fastpath(query)
+        if exact_match is not None:
+            if use_cache:
+                self._result_cache.put(cache_key, exact_match)
+            return exact_match
         
         try:
-            # Run the task with BrowserAgentBehavior
-            result = asyncio.run(self.browser._run_task(
-                restricted_task, 
+            result, complete = await self.browser._search_sources_concurrently(
+                query, 
+                task_template=LITERATURE_SEARCH_TASK_PROMPT,
+                system_prompt=self.system_prompt,
+                max_results=max_results,
                 max_steps=max_steps, 
-                download_path=download_path
-            ))
+                download_path=actual_download_path
+            )
+            if use_cache and complete:
+                self._result_cache.put(cache_key, result)
             return result or "No literature found."
         except Exception as e:
             error_msg = f"Error searching literature: {str(e)}"
             logging.error(error_msg)
             return error_msg
 
+    async def _literature_searching_task(self, query: str, max_results: int = 5) -> str:
+        """Async entry point for callers already running on an event loop, with the default step budget."""
+        return await self._run_literature_search(query, max_results, DEFAULT_MAX_STEPS, self.download_path)
 
-class GeneralBrowserTool(Tool):
-    name = "general_browser_task"
-    description = "Run a general web search and return the results."
-    inputs = {
-        "query": {"type": "string", "description": "The search query"},
-        "max_steps": {"type": "integer", "description": "Maximum number of steps the agent can take", "default": 38, "nullable": True},
-        "download_path": {"type": "string", "description": "Path to download PDF files", "default": "general_downloads", "nullable": True}
-    }
-    output_type = "string"
-
-    def __init__(self, api_key=None, download_path=None):
+    def forward(self, query: str, max_results: int = 5, max_steps: int = 38, download_path: str = None) -> str:
         """
-        Initialize the general browser tool.
+        Search for literature and return the most relevant sources for the query.
         
         Args:
-            api_key: OpenAI API key
+            query: The research query or topic to search for
+            max_results: Maximum number of sources to return (default 5)
+            max_steps: Maximum number of steps the agent can take, estimated from the query when left at the default
             download_path: Path to download PDF files
+            
+        Returns:
+            String containing the most relevant literature with explanations
         """
-        super().__init__()
-        self.download_path = download_path or "general_downloads"
-        self.system_prompt = f"""You are WebSearchBot, a sophisticated web research assistant capable of finding and analyzing information from online sources.
+        return _run_in_event_loop(self._run_literature_search(query, max_results, max_steps, download_path))
+
+
+# System prompt for the WebSearchBot general browsing agent, formatted with the download directory
+WEB_SEARCH_SYSTEM_PROMPT = """You are WebSearchBot, a sophisticated web research assistant capable of finding and analyzing information from online sources.
 
 Your primary task is to search the web and retrieve accurate, relevant information in response to queries.
 
@@ -859,169 +1350,48 @@ CRITICAL INSTRUCTIONS:
 3. Navigate through multiple pages when necessary to find complete information
 4. When you find useful PDF files, download them for further analysis
 5. Always provide direct links to your sources
-6. IMPORTANT: Wait 3-5 seconds between each page operation to avoid being blocked
-
-BROWSER HANDLING GUIDELINES:
-- Always pause 3-5 seconds between opening new tabs/pages
-- Wait 3-5 seconds after closing a tab before opening a new one
-- Pause a few seconds after performing a search before clicking on results
-- Space out your interactions to appear more human-like and avoid triggering anti-bot measures
-
-GOOGLE DOMAIN ROTATION:
-- For EACH new Google search (books, scholar, or regular search), randomly select one of these Google domains:
-  www.google.com, www.google.ca, www.google.fr, www.google.co.uk, www.google.de, 
-  www.google.com.au, www.google.co.jp, www.google.co.in, www.google.com.br, www.google.ru,
-  www.google.it, www.google.es, www.google.com.mx, www.google.co.kr, www.google.nl,
-  www.google.pl, www.google.com.sg, www.google.co.za, www.google.com.tr, www.google.se
-- For example, instead of going to https://books.google.com/, go to https://books.[random-domain]
-- Instead of searching on https://scholar.google.com/, use https://scholar.[random-domain]
-- This helps avoid rate limiting or IP blocks from any single Google domain
-- Wait 5-7 seconds between searches on different Google domains
-
-PDF DOWNLOAD INSTRUCTIONS:
-- When you find useful PDF documents, download them using the browser's download functionality
-- Save all PDF files to: {self.download_path}
-- Do NOT attempt to download files behind paywalls or requiring login
-- After downloading, note the filename and location of each downloaded PDF
-- Include the PDF filename in your report
-
-AUTHENTICATION HANDLING:
-- If you encounter login walls, CAPTCHA verification, or paywalls, exit that page immediately
-- Do NOT attempt to bypass security measures or enter credentials
-- Simply note "Authentication required" for that source and try different sources
-- Only spend time on resources that are freely accessible without authentication
+6. Follow the SHARED RULES below for every search and page
 
 RESEARCH METHODOLOGY:
 - Start with broad search queries and refine based on initial results
 - Compare information across multiple sources to verify accuracy
 - Prioritize authoritative sources (educational institutions, government sites, reputable news outlets)
 - Note when information is conflicting or uncertain
-- Provide a balanced view when topics have multiple perspectives"""
-        self.browser = LiteratureSearchBrowser(api_key=api_key, system_prompt=self.system_prompt, download_path=download_path)
+- Provide a balanced view when topics have multiple perspectives
 
-    def forward(self, query: str, max_steps: int = 38, download_path: str = None) -> str:
-        """
-        Run a general web search and return the results.
-        
-        Args:
-            query: The search query
-            max_steps: Maximum number of steps the agent can take
-            download_path: Path to download PDF files
-            
-        Returns:
-            String containing the search results
-        """
-        logging.info(f"Running general web search for query: {query}")
-        actual_download_path = download_path or self.download_path
-        
-        restricted_task = f"""
+""" + BROWSER_SHARED_RULES
+
+# Task prompt for GeneralBrowserTool.forward
+GENERAL_SEARCH_TASK_PROMPT = """
         As a web research assistant, search for information about: {query}
         
-        FOLLOW THIS COMPREHENSIVE SEARCH STRATEGY:
+        FOLLOW THIS COMPREHENSIVE SEARCH STRATEGY, applying the SHARED RULES from your instructions to every search.
+        Use these Google domains (§1), in turn: {google_domains}
         
         STEP 1: Start with a general Google Search
-        - IMPORTANT: Instead of using www.google.com, randomly select from these Google domains:
-          www.google.com, www.google.ca, www.google.fr, www.google.co.uk, www.google.de, 
-          www.google.com.au, www.google.co.jp, www.google.co.in, www.google.com.br, www.google.ru,
-          www.google.it, www.google.es, www.google.com.mx, www.google.co.kr, www.google.nl
-        - Use a different domain for each search to avoid rate limiting
-        - Wait 5-7 seconds between searches on different domains
-        - If it is not an exact match question, search for information using precise keywords from the query. If it is an exact match question, search for the exact wording of the query.
-        - For exactMatch questions, ALWAYS remove any blanks (like "____" or "[BLANK]") from the question before searching
-        - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-        - This is CRITICAL because online texts won't contain these blank placeholders
+        - Search for precise keywords from the query, or for the exact wording of exactMatch questions (§2)
         - Visit multiple relevant pages to gather detailed information
         - Extract the most relevant content from each page
-        - Wait 3-5 seconds between page operations (opening pages, clicking links)
-        - After finishing with each page, CLOSE THE TAB before moving to the next one
         
         STEP 2: For academic or historical topics, also check Google Scholar
-        - IMPORTANT: Instead of using scholar.google.com, randomly select from these Google domains:
-          scholar.google.com, scholar.google.ca, scholar.google.fr, scholar.google.co.uk, scholar.google.de, 
-          scholar.google.com.au, scholar.google.co.jp, scholar.google.co.in, scholar.google.com.br, scholar.google.it,
-          scholar.google.es, scholar.google.com.mx, scholar.google.co.kr, scholar.google.nl
-        - Use a different domain than you used for your general Google search
-        - Wait 5-7 seconds between searches on different domains
         - Search for scholarly articles related to the query
-        - For exactMatch questions, ALWAYS remember to search without any blanks
-        - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815" 
-        - This is CRITICAL because scholarly texts won't contain these blank placeholders
         - Always try to access the full text when possible
         - Extract precise quotes and information
-        - Wait 3-5 seconds between page operations (opening articles, clicking links)
-        - After finishing with each article, CLOSE THE TAB before moving to the next source
         
         STEP 3: For book content, check Google Books
-        - IMPORTANT: Instead of using books.google.com, randomly select from these Google domains:
-          books.google.com, books.google.ca, books.google.fr, books.google.co.uk, books.google.de, 
-          books.google.com.au, books.google.co.jp, books.google.co.in, books.google.com.br, books.google.ru,
-          books.google.it, books.google.es, books.google.com.mx, books.google.co.kr, books.google.nl
-        - Use a different domain than you used in previous searches
-        - Wait 5-7 seconds between searches on different domains
         - Search for books related to the query
-        - For exactMatch questions, ALWAYS remove any blanks from the question before searching
-        - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815" 
-        - This is CRITICAL because book texts won't contain these blank placeholders
-        - CRITICALLY IMPORTANT: If your search redirects to a regular Google page (URL starting with https://www.google.com/search?):
-          * Look for a section labeled "在书中找到匹配结果" (matching results found in books)
-          * IMPORTANT: When you see HTML with <div class="VNSPub">在书中找到匹配结果</div>, extract all HTML information that follows this div - this contains the matching results
-          * The content will typically appear in a structure like: <div class="cmlJmd ETWPw"><div class="VNSPub">在书中找到匹配结果</div><span><span>... text content with <em>highlighted parts</em> ...</span></span></div>
-          * Extract the text within the <span> elements that follow the VNSPub div
-          * Pay special attention to text highlighted with <em> tags - these are the exact matches to your search query
-          * For extraction purposes, preserve the <em> tags to identify matched content
-          * For your final answer, you can remove the <em> tags while still emphasizing this matched content
-          * Example: If you see "<em>In 1825</em> the Bourbon regime... In <em>Franche-Comté</em>...", extract this entire text and note that "In 1825" and "Franche-Comté" were highlighted matches
-          * This section contains direct text snippets from books matching your search
-          * READ THESE SNIPPETS CAREFULLY FIRST before anything else
-          * For exactMatch questions, the answer is very likely to be found in these snippets
-          * If you find a matching snippet, record the text and book source immediately
-          * If a snippet perfectly matches the query for an exactMatch question, STOP SEARCHING and return that result
-        - IMPORTANT: On the Google Books search results page, CAREFULLY CHECK THE SNIPPETS first:
-          * Read each snippet on the search results page carefully
-          * If a snippet perfectly matches the query (with blanks removed for exactMatch questions), YOU CAN STOP SEARCHING
-          * Simply record that snippet along with its source book details and return it immediately
-          * For exactMatch questions, once you've found an exact match in a snippet, no further searching is needed
+        - Check the book match section and the snippets on the results page first (§2)
         - Use book previews to locate relevant sections
         - If Google Books redirects to regular Google, make sure to select "Books" filter below the search bar
         - Extract relevant information from accessible book previews
         - Record page numbers when available
-        - Wait 3-5 seconds between page operations
-        - After finishing with each book, CLOSE THE TAB before moving to the next one
-        
-        BROWSER MANAGEMENT:
-        - Always wait 3-5 seconds between opening new tabs or pages
-        - Pause 3-5 seconds between searches
-        - Wait 3-5 seconds after closing a tab before opening a new one
-        - Space out your interactions to appear more human-like
         
         COMPARISON ACROSS SOURCES:
         - Compare information across different sources to verify accuracy
         - Note any contradictions or different perspectives
         - Prioritize authoritative sources (educational institutions, government sites, reputable publications)
         
-        PDF DOWNLOAD INSTRUCTIONS:
-        - When you find useful PDF documents, download them to this specific directory: {actual_download_path}
-        - After downloading, note the filename and specific location of each downloaded PDF
-        - Include the PDF filename in your report
-        
-        IMPORTANT HANDLING:
-        - If you encounter login walls, paywalls, or CAPTCHA verification, exit that page and try another source
-        - Do not attempt to bypass security measures
-        - Focus on freely accessible sources
-        
-        CRITICAL FOR EXACTMATCH QUESTIONS:
-        - For exactMatch type questions, finding the precise original wording is ESSENTIAL
-        - The complete and precise answer exists verbatim in the literature and must be found
-        - ALWAYS remove any blanks (like "____", "___", or "[BLANK]") from the question before searching
-        - This is CRITICAL because texts won't contain these blank placeholders
-        - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-        - The answer you're looking for will fill in the blank with the correct term
-        - Always check the "在书中找到匹配结果" (matching results found in books) section first for exactMatch questions
-        - IMPORTANT: Look for HTML with <div class="VNSPub">在书中找到匹配结果</div> and extract all information that follows this div
-        - If you find a snippet that exactly matches the query (with blanks removed), STOP SEARCHING and return that immediately
-        - CRITICALLY IMPORTANT FOR FINAL ANSWER: When extracting information and presenting results, ADD BACK THE BLANKS and fill them in with the correct information
-        - Example: If you searched for "The Battle of was fought in 1815" and found "The Battle of Waterloo was fought in 1815", your final answer should be "The Battle of _Waterloo_ was fought in 1815"
-        - Always highlight or emphasize the filled-in information that was originally a blank in the question
+        Download PDFs (§3) to this specific directory: {actual_download_path}
         
         For each important source, document:
         - The full title and URL
@@ -1033,21 +1403,196 @@ RESEARCH METHODOLOGY:
         
         Format your response as a comprehensive summary of the information found, comparing across sources and highlighting the most relevant findings. Include all sources and downloaded files.
         """
+
+class GeneralBrowserTool(Tool):
+    name = "general_browser_task"
+    description = "Run a general web search and return the results."
+    inputs = {
+        "query": {"type": "string", "description": "The search query"},
+        "max_steps": {"type": "integer", "description": "Maximum number of steps the agent can take", "default": 38, "nullable": True},
+        "download_path": {"type": "string", "description": "Path to download PDF files", "default": "general_downloads", "nullable": True}
+    }
+    output_type = "string"
+
+    def __init__(self, api_key=None, download_path=None):
+        """
+        Initialize the general browser tool.
+        
+        Args:
+            api_key: OpenAI API key
+            download_path: Path to download PDF files
+        """
+        super().__init__()
+        self.download_path = download_path or "general_downloads"
+        self.system_prompt = _render_system_prompt(WEB_SEARCH_SYSTEM_PROMPT, self.download_path)
+        # The browser is looked up on first use, so registered but unused tools stay cheap
+        self._browser_kwargs = dict(api_key=api_key, download_path=download_path)
+        self._result_cache = _ResultCache(self.download_path, self.name)
+
+    @property
+    def browser(self) -> LiteratureSearchBrowser:
+        """The shared LiteratureSearchBrowser running this tool's tasks, looked up on first access."""
+        browser = self.__dict__.get("_browser")
+        if browser is None:
+            browser = self._browser = _get_browser(**self._browser_kwargs)
+        return browser
+
+    def forward(self, query: str, max_steps: int = 38, download_path: str = None) -> str:
+        """
+        Run a general web search and return the results.
+        
+        Args:
+            query: The search query
+            max_steps: Maximum number of steps the agent can take
+            download_path: Path to download PDF files
+            
+        Returns:
+            String containing the search results
+        """
+        logging.info("Running general web search for query: %s", query)
+        actual_download_path = download_path or self.download_path
+        
+        # Downloads requested into a different directory need a fresh run
+        use_cache = actual_download_path == self.download_path
+        cache_key = _ResultCache.make_key(query)
+        if use_cache:
+            cached_result = self._result_cache.get(cache_key)
+            if cached_result is not None:
+                logging.info("Using cached web search results for query: %s", query)
+                return cached_result
+        
+        restricted_task = GENERAL_SEARCH_TASK_PROMPT.format_map({
+            "query": query,
+            "actual_download_path": actual_download_path,
+            "google_domains": ", ".join(GOOGLE_DOMAINS[index] for index in _next_google_domain_indices(GOOGLE_DOMAINS_PER_TASK))
+        })
         
         try:
             # Run the task with BrowserAgentBehavior
-            result = asyncio.run(self.browser._run_task(
+            result = _run_in_event_loop(self.browser._run_task(
                 restricted_task, 
                 max_steps=max_steps, 
-                download_path=download_path
+                download_path=actual_download_path,
+                system_prompt=self.system_prompt
             ))
-            return result
+            # Error messages come back as plain strings and are not cached
+            if isinstance(result, str):
+                return result
+            # Always hand back the agent's answer as text, so cached and fresh calls return the same thing
+            answer = result.final_result() or str(result)
+            if use_cache and result.is_done():
+                self._result_cache.put(cache_key, answer)
+            return answer
         except Exception as e:
             error_msg = f"Error in general browser task: {str(e)}"
             logging.error(error_msg)
             return error_msg
 
 
+# Task prompt for RelevantLiteratureFinderTool, run with SCHOLAR_SYSTEM_PROMPT and formatted once per search source
+RELEVANT_LITERATURE_SEARCH_TASK_PROMPT = """Search for high-impact, recent scholarly articles and relevant content about: {query}. 
+        
+        CRITICAL INSTRUCTION: You MUST click into each article to read the full text or abstract page. Do not just rely on the search results page.
+        
+        Other assistants are searching the remaining sources in parallel, so ONLY search the source below. Follow the SHARED RULES from your instructions.
+        
+        {search_phase}
+        
+        Download PDFs (§3) to this specific directory: {actual_download_path}
+        
+        SPECIAL INSTRUCTIONS FOR EXACTMATCH QUESTIONS (in addition to §2):
+        - You only need to find ONE most relevant literature source, and should only return that source
+        - If the source appears as a small image segment, carefully extract the text from the image and include it in your response
+        - After filling in the blanks, verify that the complete sentence can be found in Google Books
+        - NEVER answer with "Unable to determine" - continue searching until you find a valid match
+        - If you stop searching because of such a match, start your answer with "{exact_match_marker}"
+        
+        Prioritize:
+        1. Sources containing EXACT text matches to the query (highest priority)
+        2. Sources where you can access full text, not just abstracts
+        3. Most relevant content to the query topic
+        4. Highly cited papers or books from reputable sources
+        
+        For each important source, document:
+        - The full title and URL
+        - Author or publisher information
+        - Publication date (if available)
+        - Key information found
+        - Exact quotes that directly address the query
+        - Any downloaded files with their locations
+        
+        Format your response as a comprehensive summary of the information found, comparing across sources and highlighting the most relevant findings. Include all sources and downloaded files.
+        """
+
+# Prompt ranking the RelevantLiteratureFinderTool search results, with the JSON example braces escaped for str.format
+RELEVANT_LITERATURE_FILTER_PROMPT = """
+        As an expert research librarian specializing in history, review the following search results and identify the {max_results} most relevant sources for answering this query: "{query}"
+        
+        Search Results:
+        {search_results}
+        
+        CRITICAL FOR EXACT MATCH QUESTIONS:
+        If this is an exactMatch type question, you MUST find and preserve the EXACT original wording from academic sources. Focus on sources where the exact text matching the query was found.
+        
+        For each selected source, provide:
+        1. Full citation with authors, title, journal, year, DOI
+        2. Direct URL to the article
+        3. Relevance score (1-10)
+        4. EXACT QUOTES from the article that match or relate to the query (preserve the exact wording)
+        5. Page number or location where the quote appears (if available)
+        6. Full abstract copied directly from the article
+        7. PDF filename if downloaded
+        8. Explanation of why this source directly answers the query
+        
+        CRITICALLY IMPORTANT: 
+        - You MUST preserve and include ANY text found that matches parts of the query word-for-word
+        - Even partial matches to the query text are extremely valuable
+        - The exact wording is essential for questions requiring precise answers
+        - Include page numbers whenever possible so the exact text can be cited properly
+        - If any PDFs were downloaded during the search, highlight these as they contain the full text
+        
+        Return your analysis in the following JSON format:
+        {{
+          "selected_sources": [
+            {{
+              "citation": "Full citation of the source",
+              "url": "Direct URL to the article",
+              "relevance_score": number between 1-10,
+              "abstract": "Full abstract from the article",
+              "exact_quotes": [
+                {{
+                  "text": "Exact quote from the article that matches or relates to the query",
+                  "page_number": "Page number or location (if available)",
+                  "matches_query": true/false (whether this exactly matches part of the query)
+                }}
+              ],
+              "relevance_explanation": "Detailed explanation of why this source directly answers the query"
+            }},
+            ...
+          ],
+          "search_summary": "Brief summary of the search results and why these particular sources were selected",
+          "exact_match_found": true/false (whether any exact matches to the query were found)
+        }}
+        
+        Only return the JSON structure, no additional text.
+        """
+
+# Markdown for each ranked source and each of its quotes in the RelevantLiteratureFinderTool report
+SOURCE_REPORT_TEMPLATE = """### Source {i}: Relevance Score {relevance_score}/10
+**Citation**: {citation}
+**URL**: {url}
+
+{abstract_block}**Key Quotes**:
+{quotes_block}
+**Why Relevant**: {relevance_explanation}
+
+----------------------
+
+"""
+
+QUOTE_REPORT_TEMPLATE = """- {match_marker}"{text}"{page_info}
+"""
+
 class RelevantLiteratureFinderTool(Tool):
     name = "relevant_literature_finder"
     description = "Search for literature and return the most relevant sources for the query."
@@ -1055,24 +1600,57 @@ class RelevantLiteratureFinderTool(Tool):
         "query": {"type": "string", "description": "The research query or topic to search for"},
         "max_results": {"type": "integer", "description": "Maximum number of sources to return (default 3)", "default": 3, "nullable": True},
         "max_steps": {"type": "integer", "description": "Maximum number of steps the agent can take", "default": 38, "nullable": True},
-        "download_path": {"type": "string", "description": "Path to download PDF files", "default": "relevant_literature_downloads", "nullable": True}
+        "download_path": {"type": "string", "description": "Path to download PDF files", "default": "relevant_literature_downloads", "nullable": True},
+        "question_type": {"type": "string", "description": "Answer type of the question, such as \"exactMatch\"; detected from blanks in the query when omitted", "nullable": True}
     }
     output_type = "string"
     
-    def __init__(self, api_key=None, download_path=None):
+    def __init__(self, api_key=None, download_path=None, max_concurrent_requests=MAX_CONCURRENT_REQUESTS_PER_DOMAIN,
+                 semantic_cache=False):
         """
         Initialize the relevant literature finder tool.
         
         Args:
             api_key: OpenAI API key
             download_path: Path to download PDF files
+            max_concurrent_requests: Maximum number of direct Google requests in flight per domain
+            semantic_cache: If True, also reuse the cached results of near-duplicate queries
+                (same numbers and capitalized names, embeddings at least SEMANTIC_CACHE_THRESHOLD similar);
+                each cache miss then costs an embeddings call
         """
         super().__init__()
         self.download_path = download_path or "relevant_literature_downloads"
-        self.system_prompt = LiteratureSearchBrowser(api_key=api_key, download_path=download_path).system_prompt
+        self.system_prompt = _render_system_prompt(SCHOLAR_SYSTEM_PROMPT, self.download_path)
         self.api_key = api_key
+        # The browser is looked up on first use, and its LLM clients also rank the search results
+        self._browser_kwargs = dict(
+            api_key=api_key, download_path=download_path, max_concurrent_requests=max_concurrent_requests
+        )
+        self._embeddings = None
+        self._result_cache = _ResultCache(self.download_path, self.name)
+        self._semantic_index = _SemanticIndex() if semantic_cache else None
 
-    async def _search_and_filter_literature(self, query: str, max_results: int = 3, max_steps: int = 38, download_path: str = None) -> str:
+    @property
+    def browser(self) -> LiteratureSearchBrowser:
+        """The shared LiteratureSearchBrowser running this tool's searches, looked up on first access."""
+        browser = self.__dict__.get("_browser")
+        if browser is None:
+            browser = self._browser = _get_browser(**self._browser_kwargs)
+        return browser
+
+    async def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Return the unit-length embedding of the normalized query, or None if it could not be computed."""
+        if self._embeddings is None:
+            self._embeddings = OpenAIEmbeddings(model=SEMANTIC_CACHE_EMBEDDING_MODEL, api_key=self.api_key)
+        try:
+            embedding = np.asarray(await self._embeddings.aembed_query(" ".join(query.split()).casefold()))
+        except Exception as e:
+            logging.warning(f"Could not embed query for the semantic result cache: {str(e)}")
+            return None
+        return embedding / np.linalg.norm(embedding)
+
+    async def _search_and_filter_literature(self, query: str, max_results: int = 3, max_steps: int = 38, download_path: str = None,
+                                            question_type: str = None) -> str:
         """
         Search for literature and then filter for the most relevant ones.
         
@@ -1081,281 +1659,124 @@ class RelevantLiteratureFinderTool(Tool):
             max_results: Maximum number of relevant results to return
             max_steps: Maximum number of steps the agent can take
             download_path: Path to download PDF files
+            question_type: Answer type of the question; only the first source is reported for an exact match on "exactMatch" questions
             
         Returns:
             String containing the most relevant literature findings
         """
         logging.info(f"Searching and filtering literature for: {query}")
         actual_download_path = download_path or self.download_path
+        if question_type is None:
+            is_exact_match_question = BLANK_PLACEHOLDER_PATTERN.search(query) is not None
+        else:
+            is_exact_match_question = question_type == "exactMatch"
+        
+        # Downloads requested into a different directory need a fresh run
+        use_cache = actual_download_path == self.download_path
+        cache_key = _ResultCache.make_key(query, max_results, is_exact_match_question)
+        embedding = None
+        anchors = _query_anchor_tokens(query)
+        if use_cache:
+            cached_result = self._result_cache.get(cache_key)
+            if cached_result is not None:
+                logging.info("Using cached relevant literature for query: %s", query)
+                return cached_result
+            # exactMatch questions hinge on their exact wording, so only look up near-duplicates of other queries;
+            # a near-duplicate must name the same years and names, which embeddings barely tell apart
+            if self._semantic_index is not None and not is_exact_match_question:
+                embedding = await self._embed_query(query)
+            if embedding is not None:
+                similar_key = self._semantic_index.find(embedding, max_results, anchors)
+                cached_result = self._result_cache.get(similar_key) if similar_key else None
+                if cached_result is not None:
+                    logging.info("Using cached relevant literature of a near-duplicate query for: %s", query)
+                    return cached_result
         
         try:
-            # Create a search task
-            search_task = f"""Search for high-impact, recent scholarly articles and relevant content about: {query}. 
-            
-            CRITICAL INSTRUCTION: You MUST click into each article to read the full text or abstract page. Do not just rely on the search results page.
-            
-            SPECIAL INSTRUCTIONS FOR EXACTMATCH QUESTIONS:
-            - If this is an exactMatch question, you only need to find ONE most relevant literature source
-            - If the source appears as a small image segment, carefully extract the text from the image and return it
-            - After filling in the blanks, verify that the complete text can be found in Google Books
-            - NEVER answer with "Unable to determine" for exactMatch questions - continue searching until you find a match
-            
-            FOLLOW THIS SEARCH STRATEGY IN ORDER:
-            
-            STEP 1: Begin with Google Books
-            - IMPORTANT: Instead of using books.google.com, randomly select from these Google domains:
-              books.google.com, books.google.ca, books.google.fr, books.google.co.uk, books.google.de, 
-              books.google.com.au, books.google.co.jp, books.google.co.in, books.google.com.br, books.google.it,
-              books.google.es, books.google.com.mx, books.google.co.kr, books.google.nl
-            - Use a different domain for each search to avoid rate limiting
-            - Wait 5-7 seconds between searches on different domains
-            - If it is not an exact match question, search for keywords directly from the query. If it is an exact match question, search for the exact wording of the query.
-            - For exactMatch questions, ALWAYS remove any blanks (like "____" or "[BLANK]") from the question before searching
-            - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-            - This is CRITICAL because scholarly texts won't contain these blank placeholders
-            - CRITICALLY IMPORTANT: If your search redirects to a regular Google page (URL starting with https://www.google.com/search?):
-              * Look for a section labeled "在书中找到匹配结果" (matching results found in books)
-              * IMPORTANT: When you see HTML with <div class="VNSPub">在书中找到匹配结果</div>, extract all HTML information that follows this div - this contains the matching results
-              * The content will typically appear in a structure like: <div class="cmlJmd ETWPw"><div class="VNSPub">在书中找到匹配结果</div><span><span>... text content with <em>highlighted parts</em> ...</span></span></div>
-              * Extract the text within the <span> elements that follow the VNSPub div
-              * Pay special attention to text highlighted with <em> tags - these are the exact matches to your search query
-              * For extraction purposes, preserve the <em> tags to identify matched content
-              * For your final answer, you can remove the <em> tags while still emphasizing this matched content
-              * Example: If you see "<em>In 1825</em> the Bourbon regime... In <em>Franche-Comté</em>...", extract this entire text and note that "In 1825" and "Franche-Comté" were highlighted matches
-              * This section contains direct text snippets from books matching your search
-              * READ THESE SNIPPETS CAREFULLY FIRST before anything else
-              * For exactMatch questions, the answer is very likely to be found in these snippets
-              * If you find a matching snippet, record the text and book source immediately
-              * If a snippet perfectly matches the query for an exactMatch question, STOP SEARCHING and return that result
-            - IMPORTANT: On the search results page, CAREFULLY CHECK THE SNIPPETS first before clicking into books:
-              * Read each snippet on the search results page carefully
-              * If a snippet perfectly matches the query (with blanks removed for exactMatch questions), YOU CAN STOP SEARCHING
-              * Simply record that snippet along with its source book details and return it immediately
-              * For exactMatch questions, once you've found an exact match in a snippet, no further searching is needed
-            - Find books with preview access related to the topic
-            - Use the "Search inside" or preview feature to locate relevant sections
-            - Important: If search results show SNIPPETS that match the query, CLICK on them to see the full context
-            - When viewing a book, use the SEARCH BOX on the left side panel to search for keywords within that book
-            - If Google Books redirects your search to regular Google (URL starting with https://www.google.com/search?q=), this is acceptable - continue with the search
-            - When redirected to regular Google, make sure "Books" is selected in the options below the search bar to filter results to book content
-            - If the Google Books search is rejected or doesn't work, try searching on regular Google.com instead, then click on the "Books" filter option below the search bar
-            - You don't need the entire book to be accessible - focus on available preview sections or snippets
-            - Look for exact quotes or information that matches the query
-            - Record exact page numbers whenever possible
-            - Wait 3-5 seconds between page operations (clicking links, opening books, performing searches)
-            - After finishing with each book, CLOSE THE TAB before moving to the next source
-            
-            STEP 2: If insufficient results from Google Books, search on Google Scholar
-            - IMPORTANT: Instead of using scholar.google.com, randomly select from these Google domains:
-              scholar.google.com, scholar.google.ca, scholar.google.fr, scholar.google.co.uk, scholar.google.de, 
-              scholar.google.com.au, scholar.google.co.jp, scholar.google.co.in, scholar.google.com.br, scholar.google.it,
-              scholar.google.es, scholar.google.com.mx, scholar.google.co.kr, scholar.google.nl
-            - Use a different domain than you used for Google Books
-            - Wait 5-7 seconds between searches on different domains
-            - Search for relevant articles using keywords from the query
-            - For exactMatch questions, ALWAYS remember to search without any blanks
-            - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815" 
-            - This is CRITICAL because scholarly texts won't contain these blank placeholders
-            - Always try to access the full text when possible
-            - Extract precise quotes and information
-            - Wait 3-5 seconds between page operations (opening articles, clicking links)
-            - After finishing with each article, CLOSE THE TAB before moving to the next source
-            
-            STEP 3: If full text is inaccessible from both Google Books and Google Scholar:
-            - Try a regular Google Search using a random Google domain from this list:
-              www.google.com, www.google.ca, www.google.fr, www.google.co.uk, www.google.de, 
-              www.google.com.au, www.google.co.jp, www.google.co.in, www.google.com.br, www.google.it,
-              www.google.es, www.google.com.mx, www.google.co.kr, www.google.nl
-            - Use a different domain than you used in previous searches
-            - Wait 5-7 seconds between searches on different domains
-            - Search for the same concepts plus terms like "quote", "excerpt", or "full text"
-            - For exactMatch questions, ALWAYS continue to search without any blanks
-            - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-            - This is ESSENTIAL because web texts won't contain these blank placeholders
-            - Look for educational websites, repositories, or other scholarly sources
-            - Check if there are alternative versions of the text on different websites
-            - Wait 3-5 seconds between page operations
-            - After finishing with each source, CLOSE THE TAB before moving to the next source
-            
-            PDF DOWNLOAD INSTRUCTIONS:
-            - When you find freely accessible PDFs, download them to this specific directory: {actual_download_path}
-            - Do NOT attempt to download files behind paywalls or requiring login
-            - After downloading, note the filename and specific location of each downloaded PDF
-            - Include the PDF filename in your report for each downloaded article
-            
-            IMPORTANT HANDLING INSTRUCTIONS:
-            - If you encounter any login walls, CAPTCHA verification, paywalls, or other authentication requirements, EXIT that page immediately and follow the alternative search steps above
-            - Do NOT attempt to bypass any security measures or authentication systems
-            - Simply note "Authentication required" for that source and move on to other accessible sources or alternative search methods
-            - Focus your time on resources that are freely accessible without login requirements
-            
-            Prioritize:
-            1. Sources containing EXACT text matches to the query (highest priority)
-            2. Sources where you can access full text, not just abstracts
-            3. Most relevant content to the query topic
-            4. Highly cited papers or books from reputable sources
-            
-            CRITICAL FOR EXACTMATCH QUESTIONS:
-            - For exactMatch type questions, finding the precise original wording is ESSENTIAL
-            - The complete and precise answer exists verbatim in the literature and must be found
-            - ALWAYS remove any blanks (like "____", "___", or "[BLANK]") from the question before searching
-            - This is CRITICAL because texts in scholarly sources won't contain these blank placeholders
-            - Example: "The Battle of _____ was fought in 1815" → search for "The Battle of was fought in 1815"
-            - When you find a match, try to fill in the blank and then verify the complete sentence with the blank filled in Google Books
-            - Only return ONE most relevant source for exactMatch questions
-            - If the source is a small image, carefully extract the text from the image and include it in your response
-            - If you find an exact match in a Google Books snippet or in the "在书中找到匹配结果" section, stop searching immediately and return that snippet with source details
-            - IMPORTANT: To find the "在书中找到匹配结果" section, look for HTML with <div class="VNSPub">在书中找到匹配结果</div> and extract all information that follows this div
-            - The content will typically appear in a structure like: <div class="cmlJmd ETWPw"><div class="VNSPub">在书中找到匹配结果</div><span><span>... text content with <em>highlighted parts</em> ...</span></span></div>
-            - Extract the text within the <span> elements that follow the VNSPub div
-            - The <em> tags highlight the exact matches to your search query - these are the most important parts to focus on
-            - When presenting your findings, you can remove the <em> tags but be sure to emphasize those matched terms
-            - CRITICALLY IMPORTANT FOR FINAL ANSWER: When extracting information and presenting results, ADD BACK THE BLANKS and fill them in with the correct information
-            - Example: If you searched for "The Battle of was fought in 1815" and found "The Battle of Waterloo was fought in 1815", your final answer should be "The Battle of _Waterloo_ was fought in 1815"
-            - Always highlight or emphasize the filled-in information that was originally a blank in the question
-            - NEVER answer with "Unable to determine" - continue searching until you find a valid match
-            
-            For each important source, document:
-            - The full title and URL
-            - Author or publisher information
-            - Publication date (if available)
-            - Key information found
-            - Exact quotes that directly address the query
-            - Any downloaded files with their locations
-            
-            Format your response as a comprehensive summary of the information found, comparing across sources and highlighting the most relevant findings. Include all sources and downloaded files.
-            """
-            
-            # Run the search task using the browser
-            config = BrowserConfig(headless=True)
-            browser = Browser(config)
-            llm = ChatOpenAI(model="gpt-4o", temperature=0, api_key=self.api_key)
-            agent = Agent(
-                task=search_task, 
-                llm=llm, 
-                # browser=browser, 
-                generate_gif=False,
-                extend_system_message=self.system_prompt
+            # Search Google Books, Google Scholar and regular Google on pooled browsers at once
+            result, complete = await self.browser._search_sources_concurrently(
+                query,
+                task_template=RELEVANT_LITERATURE_SEARCH_TASK_PROMPT,
+                system_prompt=self.system_prompt,
+                max_results=max_results,
+                max_steps=max_steps,
+                download_path=actual_download_path
             )
-            result = await agent.run(max_steps=max_steps)
-            await browser.close()  # 关闭浏览器
+            if not result:
+                return "Literature search error: no search results"
             
             # Use GPT to filter and rank the most relevant results
-            filter_llm = ChatOpenAI(model="gpt-4o", temperature=0, api_key=self.api_key)
-            
-            prompt = f"""
-            As an expert research librarian specializing in history, review the following search results and identify the {max_results} most relevant sources for answering this query: "{query}"
-            
-            Search Results:
-            {result.final_result}
-            
-            CRITICAL FOR EXACT MATCH QUESTIONS:
-            If this is an exactMatch type question, you MUST find and preserve the EXACT original wording from academic sources. Focus on sources where the exact text matching the query was found.
-            
-            For each selected source, provide:
-            1. Full citation with authors, title, journal, year, DOI
-            2. Direct URL to the article
-            3. Relevance score (1-10)
-            4. EXACT QUOTES from the article that match or relate to the query (preserve the exact wording)
-            5. Page number or location where the quote appears (if available)
-            6. Full abstract copied directly from the article
-            7. PDF filename if downloaded
-            8. Explanation of why this source directly answers the query
-            
-            CRITICALLY IMPORTANT: 
-            - You MUST preserve and include ANY text found that matches parts of the query word-for-word
-            - Even partial matches to the query text are extremely valuable
-            - The exact wording is essential for questions requiring precise answers
-            - Include page numbers whenever possible so the exact text can be cited properly
-            - If any PDFs were downloaded during the search, highlight these as they contain the full text
-            
-            Return your analysis in the following JSON format:
-            {
-              "selected_sources": [
-                {
-                  "citation": "Full citation of the source",
-                  "url": "Direct URL to the article",
-                  "relevance_score": number between 1-10,
-                  "abstract": "Full abstract from the article",
-                  "exact_quotes": [
-                    {
-                      "text": "Exact quote from the article that matches or relates to the query",
-                      "page_number": "Page number or location (if available)",
-                      "matches_query": true/false (whether this exactly matches part of the query)
-                    }
-                  ],
-                  "relevance_explanation": "Detailed explanation of why this source directly answers the query"
-                },
-                ...
-              ],
-              "search_summary": "Brief summary of the search results and why these particular sources were selected",
-              "exact_match_found": true/false (whether any exact matches to the query were found)
-            }
-            
-            Only return the JSON structure, no additional text.
-            """
-            
-            response = filter_llm.invoke(prompt)
-            json_strings = response.content
+            prompt = RELEVANT_LITERATURE_FILTER_PROMPT.format_map({
+                "query": query,
+                "max_results": max_results,
+                "search_results": result
+            })
+            
+            # The whole response is awaited rather than streamed: the report header depends on
+            # exact_match_found, which the JSON format puts last, and fenced responses only
+            # parse once complete
+            # The ranking prompt does not start with the agents' system prompt, so it must not share their prompt cache
+            response = await self.browser._get_plain_llm().ainvoke(prompt)
             
-            # Try to extract JSON if wrapped in markdown code block
-            json_pattern = r'```(?:json)?\n(.*?)\n```'
-            match = re.search(json_pattern, json_strings, re.DOTALL)
-            if match:
-                parsed_results = match.group(1)
-            else:
-                # Otherwise use the entire response
-                parsed_results = json_strings
-                
             try:
-                result_obj = json.loads(parsed_results)
+                result_obj = _parse_llm_json(response.content)
                 selected_sources = result_obj.get("selected_sources", [])
                 exact_match_found = result_obj.get("exact_match_found", False)
                 
+                if exact_match_found and is_exact_match_question:
+                    # The first source already holds the exact wording, so skip formatting the rest
+                    selected_sources = selected_sources[:1]
+                
                 # Format the results in a more readable way
-                filtered_results = f"## Most Relevant Literature for: {query}\n\n"
+                parts = [f"## Most Relevant Literature for: {query}\n\n"]
                 
                 if exact_match_found:
-                    filtered_results += f"### EXACT MATCH FOUND! The query text was located in the literature.\n\n"
+                    parts.append(f"### EXACT MATCH FOUND! The query text was located in the literature.\n\n")
                 
                 for i, source in enumerate(selected_sources, 1):
-                    filtered_results += f"### Source {i}: Relevance Score {source.get('relevance_score')}/10\n"
-                    filtered_results += f"**Citation**: {source.get('citation')}\n"
-                    filtered_results += f"**URL**: {source.get('url', 'Not provided')}\n\n"
-                    
-                    # Add abstract
-                    if source.get('abstract'):
-                        filtered_results += f"**Abstract**: {source.get('abstract')}\n\n"
+                    abstract = source.get('abstract')
                     
-                    # Add exact quotes section with formatting to highlight exact matches
-                    filtered_results += "**Key Quotes**:\n"
-                    for quote in source.get('exact_quotes', []):
-                        quote_text = quote.get('text', '')
-                        page_info = f" (Page: {quote.get('page_number')})" if quote.get('page_number') else ""
-                        
-                        if quote.get('matches_query'):
-                            filtered_results += f"- **EXACT MATCH!** \"{quote_text}\"{page_info}\n"
-                        else:
-                            filtered_results += f"- \"{quote_text}\"{page_info}\n"
+                    # Format the exact quotes, highlighting exact matches
+                    quote_lines = []
+                    for quote in source.get('exact_quotes', ()):
+                        page_number = quote.get('page_number')
+                        quote_lines.append(QUOTE_REPORT_TEMPLATE.format_map({
+                            "match_marker": "**EXACT MATCH!** " if quote.get('matches_query') else "",
+                            "text": quote.get('text', ''),
+                            "page_info": f" (Page: {page_number})" if page_number else ""
+                        }))
                     
-                    filtered_results += f"\n**Why Relevant**: {source.get('relevance_explanation')}\n\n"
-                    filtered_results += "----------------------\n\n"
+                    parts.append(SOURCE_REPORT_TEMPLATE.format_map({
+                        "i": i,
+                        "relevance_score": source.get('relevance_score'),
+                        "citation": source.get('citation'),
+                        "url": source.get('url', 'Not provided'),
+                        "abstract_block": f"**Abstract**: {abstract}\n\n" if abstract else "",
+                        "quotes_block": "".join(quote_lines),
+                        "relevance_explanation": source.get('relevance_explanation')
+                    }))
                 
-                filtered_results += f"## Search Summary\n{result_obj.get('search_summary', 'No summary provided.')}"
+                parts.append(f"## Search Summary\n{result_obj.get('search_summary', 'No summary provided.')}")
                 
+                filtered_results = "".join(parts)
+                if use_cache and complete:
+                    self._result_cache.put(cache_key, filtered_results)
+                    if embedding is not None:
+                        self._semantic_index.add(cache_key, embedding, max_results, anchors)
                 return filtered_results
                 
             except json.JSONDecodeError:
                 # If JSON parsing fails, return the raw search results
                 logging.warning("Could not parse JSON from LLM response, returning raw search results")
-                return f"Could not process search results in the expected format. Raw search results:\n\n{result.final_result}"
+                return f"Could not process search results in the expected format. Raw search results:\n\n{result}"
                 
         except Exception as e:
             error_msg = f"Error filtering relevant literature: {str(e)}"
             logging.error(error_msg)
             return f"Literature search error: {str(e)}"
 
-    def forward(self, query: str, max_results: int = 3, max_steps: int = 38, download_path: str = None) -> str:
+    def forward(self, query: str, max_results: int = 3, max_steps: int = 38, download_path: str = None,
+                question_type: str = None) -> str:
         """
         Search for literature and return the most relevant sources for the query.
         
@@ -1364,11 +1785,53 @@ class RelevantLiteratureFinderTool(Tool):
             max_results: Maximum number of sources to return (default 3)
             max_steps: Maximum number of steps the agent can take
             download_path: Path to download PDF files
+            question_type: Answer type of the question, such as "exactMatch"; detected from blanks in the query when omitted
             
         Returns:
             String containing the most relevant literature with explanations
         """
-        return asyncio.run(self._search_and_filter_literature(query, max_results, max_steps, download_path))
+        return _run_in_event_loop(self._search_and_filter_literature(query, max_results, max_steps, download_path, question_type))
+
+def _markdown_for_tag(match: re.Match) -> str:
+    """Replacement for HTML_TAG_PATTERN: markdown bold for <em> and </em>, nothing for other tags."""
+    return '**' if match.group(1) else ''
+
+def _iter_book_match_fragments(i: int, match: Dict[str, Any]):
+    """Yield the markdown fragments describing a single book match snippet."""
+    yield f"### Match {i}:\n\n"
+    
+    book_title = match.get('book_title')
+    if book_title:
+        yield f"**Book**: {book_title}\n"
+        
+    book_link = match.get('book_link')
+    if book_link:
+        yield f"**Link**: {book_link}\n\n"
+    
+    snippet_html = match.get('snippet_html')
+    if snippet_html:
+        # For HTML snippet, preserve the formatting but clean up for readability:
+        # <em> tags become markdown bold for highlighting, other HTML tags are removed
+        html_snippet = HTML_TAG_PATTERN.sub(_markdown_for_tag, snippet_html) if '<' in snippet_html else snippet_html
+        yield f"**Snippet (with highlights)**:\n{html_snippet}\n\n"
+    
+    snippet_text = match.get('snippet_text')
+    if snippet_text:
+        yield f"**Plain Text Snippet**:\n{snippet_text}\n\n"
+    
+    highlights_text = match.get('highlights_text')
+    if highlights_text:
+        yield f"**Highlighted Terms**: {highlights_text}\n\n"
+
+# Horizontal rule placed between (not after) the formatted book matches
+BOOK_MATCH_SEPARATOR = "---\n\n"
+
+def _format_book_match_snippets(heading: str, book_matches: List[Dict[str, Any]]) -> str:
+    """Format book match snippets as the markdown report returned by the book match tools."""
+    return heading + BOOK_MATCH_SEPARATOR.join(
+        "".join(_iter_book_match_fragments(i, match))
+        for i, match in enumerate(book_matches, 1)
+    )
 
 class BookMatchExtractorTool(Tool):
     name = "book_match_extractor"
@@ -1379,18 +1842,21 @@ class BookMatchExtractorTool(Tool):
     }
     output_type = "string"
 
-    def __init__(self, api_key=None, download_path=None):
+    def __init__(self, api_key=None, download_path=None, max_concurrent_requests=MAX_CONCURRENT_REQUESTS_PER_DOMAIN):
         """
         Initialize the book match extractor tool.
         
         Args:
             api_key: OpenAI API key
             download_path: Path to download PDF files
+            max_concurrent_requests: Maximum number of direct Google requests in flight per domain
         """
         super().__init__()
         self.download_path = download_path or "book_match_downloads"
         # Use the system prompt from LiteratureSearchBrowser
-        self.browser = LiteratureSearchBrowser(api_key=api_key, download_path=download_path)
+        self.browser = _get_browser(
+            api_key=api_key, download_path=download_path, max_concurrent_requests=max_concurrent_requests
+        )
         self.api_key = api_key
 
     async def _extract_book_matches_async(self, query: str, max_steps: int = 38) -> str:
@@ -1419,36 +1885,7 @@ class BookMatchExtractorTool(Tool):
             return f"No book match snippets found for query: {query}\nSearch URL: {search_url}"
         
         # Format the results
-        results = f"## Book Match Snippets for: {query}\n\n"
-        results += f"Search URL: {search_url}\n\n"
-        
-        for i, match in enumerate(book_matches, 1):
-            results += f"### Match {i}:\n\n"
-            
-            if 'book_title' in match and match['book_title']:
-                results += f"**Book**: {match['book_title']}\n"
-                
-            if 'book_link' in match and match['book_link']:
-                results += f"**Link**: {match['book_link']}\n\n"
-            
-            if 'snippet_html' in match and match['snippet_html']:
-                # For HTML snippet, preserve the formatting but clean up for readability
-                html_snippet = match['snippet_html']
-                # Replace <em> tags with markdown bold for highlighting
-                html_snippet = html_snippet.replace('<em>', '**').replace('</em>', '**')
-                # Remove other HTML tags
-                html_snippet = re.sub(r'<[^>]*>', '', html_snippet)
-                results += f"**Snippet (with highlights)**:\n{html_snippet}\n\n"
-            
-            if 'snippet_text' in match and match['snippet_text']:
-                results += f"**Plain Text Snippet**:\n{match['snippet_text']}\n\n"
-            
-            if 'highlights' in match and match['highlights']:
-                results += f"**Highlighted Terms**: {', '.join(match['highlights'])}\n\n"
-            
-            results += "---\n\n"
-        
-        return results
+        return _format_book_match_snippets(f"## Book Match Snippets for: {query}\n\nSearch URL: {search_url}\n\n", book_matches)
 
     def forward(self, query: str, max_steps: int = 38) -> str:
         """
@@ -1462,7 +1899,7 @@ class BookMatchExtractorTool(Tool):
             Formatted string containing the extracted book match snippets
         """
         logging.info(f"Extracting book matches for query: {query}")
-        return asyncio.run(self._extract_book_matches_async(query, max_steps))
+        return _run_in_event_loop(self._extract_book_matches_async(query, max_steps))
 
 class DirectGoogleBooksCrawlerTool(Tool):
     name = "direct_google_books_crawler"
@@ -1472,18 +1909,21 @@ class DirectGoogleBooksCrawlerTool(Tool):
     }
     output_type = "string"
 
-    def __init__(self, api_key=None, download_path=None):
+    def __init__(self, api_key=None, download_path=None, max_concurrent_requests=MAX_CONCURRENT_REQUESTS_PER_DOMAIN):
         """
         Initialize the direct Google Books crawler tool.
         
         Args:
             api_key: OpenAI API key
             download_path: Path to download PDF files
+            max_concurrent_requests: Maximum number of direct Google requests in flight per domain
         """
         super().__init__()
         self.download_path = download_path or "book_match_downloads"
         # Use the system prompt from LiteratureSearchBrowser
-        self.browser = LiteratureSearchBrowser(api_key=api_key, download_path=download_path)
+        self.browser = _get_browser(
+            api_key=api_key, download_path=download_path, max_concurrent_requests=max_concurrent_requests
+        )
         self.api_key = api_key
 
     async def _parse_google_books_url_async(self, url: str) -> str:
@@ -1502,36 +1942,7 @@ class DirectGoogleBooksCrawlerTool(Tool):
             return f"No book match snippets found at URL: {url}"
         
         # Format the results
-        results = f"## Book Match Snippets from URL\n\n"
-        results += f"Source URL: {url}\n\n"
-        
-        for i, match in enumerate(book_matches, 1):
-            results += f"### Match {i}:\n\n"
-            
-            if 'book_title' in match and match['book_title']:
-                results += f"**Book**: {match['book_title']}\n"
-                
-            if 'book_link' in match and match['book_link']:
-                results += f"**Link**: {match['book_link']}\n\n"
-            
-            if 'snippet_html' in match and match['snippet_html']:
-                # For HTML snippet, preserve the formatting but clean up for readability
-                html_snippet = match['snippet_html']
-                # Replace <em> tags with markdown bold for highlighting
-                html_snippet = html_snippet.replace('<em>', '**').replace('</em>', '**')
-                # Remove other HTML tags
-                html_snippet = re.sub(r'<[^>]*>', '', html_snippet)
-                results += f"**Snippet (with highlights)**:\n{html_snippet}\n\n"
-            
-            if 'snippet_text' in match and match['snippet_text']:
-                results += f"**Plain Text Snippet**:\n{match['snippet_text']}\n\n"
-            
-            if 'highlights' in match and match['highlights']:
-                results += f"**Highlighted Terms**: {', '.join(match['highlights'])}\n\n"
-            
-            results += "---\n\n"
-        
-        return results
+        return _format_book_match_snippets(f"## Book Match Snippets from URL\n\nSource URL: {url}\n\n", book_matches)
 
     def forward(self, url: str) -> str:
         """
@@ -1544,24 +1955,27 @@ class DirectGoogleBooksCrawlerTool(Tool):
             Formatted string containing the extracted book match snippets
         """
         logging.info(f"Parsing Google Books URL: {url}")
-        return asyncio.run(self._parse_google_books_url_async(url))
+        return _run_in_event_loop(self._parse_google_books_url_async(url))
 
 # Update the create_literature_tools function to include the new tools
+@functools.lru_cache(maxsize=8)
 def create_literature_tools(api_key=None, download_path=None):
     """
     Create a set of literature tools that use the provided API key.
     
+    The tools are created once per API key and download path and shared by later calls.
+    
     Args:
         api_key: The OpenAI API key to use for all tools
         download_path: Path to download PDF files
         
     Returns:
-        Dictionary containing tool instances
+        Read-only mapping containing tool instances
     """
-    return {
+    return MappingProxyType({
         "literature_searching_task": LiteratureSearchingTool(api_key=api_key, download_path=download_path),
         "general_browser_task": GeneralBrowserTool(api_key=api_key, download_path=download_path),
         "relevant_literature_finder": RelevantLiteratureFinderTool(api_key=api_key, download_path=download_path),
         "book_match_extractor": BookMatchExtractorTool(api_key=api_key, download_path=download_path),
         "direct_google_books_crawler": DirectGoogleBooksCrawlerTool(api_key=api_key, download_path=download_path)
-    } 
+    })
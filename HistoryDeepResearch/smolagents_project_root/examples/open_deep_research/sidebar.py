@@ -8,46 +8,51 @@ load_dotenv()
 
 def sidebar():
     with st.sidebar:
-        st.markdown(
-            "## How to use\n"
-            "1. Enter your [OpenAI API key](https://platform.openai.com/account/api-keys) below🔑\n" \
-            "**However, it's now a test version, so we have already set the OpenAI API key for you**.\n"  # noqa: E501
-            "2. Ask a question about the history💬\n"
-            "3. If needed, you can upload a pdf, docx, or txt file📄\n"
-        )
-        api_key_input = st.text_input(
-            "OpenAI API Key",
-            type="password",
-            placeholder="We have already set it for you since it's a test mode",
-            help="You can get your API key from https://platform.openai.com/account/api-keys.",  # noqa: E501
-            # value=os.environ.get("OPENAI_API_KEY", None)
-            # or st.session_state.get("OPENAI_API_KEY", ""),
-        )
+        sidebar_content()
 
-        st.session_state["OPENAI_API_KEY"] = api_key_input
-        st.markdown("---")
-        st.markdown("# About")
-        st.markdown(
-            "📚 **History Deep Research** is a multimodal AI platform that combines "
-            "large language models (LLMs) with a multi-agent tool framework "
-            "to assist with in-depth historical material analysis. \n\n"
-            "The system supports multiple functions:\n"
-            "- Text Web Browser\n"
-            "- Literature Finder\n"
-            "- OCR\n"
-            "- Speech Recognition\n"
-            "- Translation \n"
-            "- Reverse Image Search\n"
-            "- File Processing\n\n"
-            "The platform emphasizes multi-source verification, context-aware reasoning, and the use "
-            "of expert-level references. It has shown significantly better performance than traditional baselines."
-        )
-        st.markdown("---")
 
+def sidebar_content():
+    """Render the sidebar body into the current container."""
+    st.markdown(
+        "## How to use\n"
+        "1. Enter your [OpenAI API key](https://platform.openai.com/account/api-keys) below🔑\n" \
+        "**However, it's now a test version, so we have already set the OpenAI API key for you**.\n"  # noqa: E501
+        "2. Ask a question about the history💬\n"
+        "3. If needed, you can upload a pdf, docx, or txt file📄\n"
+    )
+    api_key_input = st.text_input(
+        "OpenAI API Key",
+        type="password",
+        placeholder="We have already set it for you since it's a test mode",
+        help="You can get your API key from https://platform.openai.com/account/api-keys.",  # noqa: E501
+        # value=os.environ.get("OPENAI_API_KEY", None)
+        # or st.session_state.get("OPENAI_API_KEY", ""),
+    )
 
+    st.session_state["OPENAI_API_KEY"] = api_key_input
+    st.markdown("---")
+    st.markdown("# About")
+    st.markdown(
+        "📚 **History Deep Research** is a multimodal AI platform that combines "
+        "large language models (LLMs) with a multi-agent tool framework "
+        "to assist with in-depth historical material analysis. \n\n"
+        "The system supports multiple functions:\n"
+        "- Text Web Browser\n"
+        "- Literature Finder\n"
+        "- OCR\n"
+        "- Speech Recognition\n"
+        "- Translation \n"
+        "- Reverse Image Search\n"
+        "- File Processing\n\n"
+        "The platform emphasizes multi-source verification, context-aware reasoning, and the use "
+        "of expert-level references. It has shown significantly better performance than traditional baselines."
+    )
+    st.markdown("---")
 
-        st.markdown(
-                """
+
+
+    st.markdown(
+            """
         # FAQ
         ## How does History Deep Research work?
         When you upload a document, image, or audio file, the system uses multiple AI tools—like OCR, reverse image search, and LLM-based summarization—to process and extract information.
@@ -71,5 +76,5 @@ def sidebar():
 
         ## What is CodeAgent?
         CodeAgent is the manager that coordinates different tools in the SmolAgent framework. It ensures that each task—like image recognition, document analysis, or web search—is assigned to the right agent.
-        """
-            )
+    """
+        )
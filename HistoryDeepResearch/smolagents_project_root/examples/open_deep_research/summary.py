@@ -9,6 +9,8 @@ from smolagents import (
 )
 import logging  # 用于日志记录
 import traceback  
+import hashlib
+from collections import OrderedDict
 
 # 配置日志记录
 task_logger = logging.getLogger("TaskLogger")
@@ -18,51 +20,15 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 handler.setFormatter(formatter)
 task_logger.addHandler(handler)
 
-def generate_summary_from_messages(messages, user_input, answer):
-    """Generate a summary based on the conversation messages history."""
-    try:
-        task_logger.info("正在生成会话消息历史的概括...")
-        question = user_input
-        answer = answer
+# 已生成的会话概括，按输入内容的哈希缓存，避免重复调用模型
+SUMMARY_CACHE_MAX_ENTRIES = 128
+_summary_cache = OrderedDict()
 
-        # 默认值
-        default_summary = "No summary available."
-        reasoning = "No reasoning process provided."
-        
-        # # 初始化结构
-        # user_messages = []
-        # assistant_messages = []
+# 推理过程短于该字符数时不调用模型，直接返回问题和答案
+MIN_REASONING_CHARS = 200
 
-        # # 遍历消息历史
-        # for message in messages:
-        #     if message["role"] == "user":
-        #         user_messages.append(message["content"])
-        #     elif message["role"] == "assistant":
-        #         assistant_messages.append(message["content"])
-        
-        # # 处理用户消息和助手消息
-        # question = user_messages[-1] if user_messages else "Unknown question"
-        # answer = assistant_messages[-1] if assistant_messages else "Unknown answer"
-
-        # # 构造模型输入
-        # reasoning = "\n\n".join([f"User: {msg}" for msg in user_messages] + 
-        #                          [f"Assistant: {msg}" for msg in assistant_messages])
-        reasoning = messages
-        model = LiteLLMModel(
-            "gpt-4o",
-            custom_role_conversions={"tool-call": "assistant", "tool-response": "user"},
-            max_completion_tokens=16000,
-        )
-        
-        # 定义消息结构
-        messages_for_model = [
-            {
-                "role": "system",
-                "content": "You are a helpful assistant summarizing a conversation history."
-            },
-            {
-                "role": "user",
-                "content": f"""Question: {question}
+# 会话概括提示词模板，按问题、答案和推理过程填充
+SUMMARY_PROMPT_TEMPLATE = """Question: {question}
 
 Answer: {answer}
 
@@ -105,6 +71,71 @@ Your summary must include the following four parts:
 
 Your report must be written clearly, sectioned by part, and all source citations must include **both quoted text and URLs**. This is the most important requirement for verification.
 """
+
+def _summary_cache_key(messages_repr, user_input, answer):
+    """Return a stable hash of the summary inputs, given the precomputed repr of the messages."""
+    digest = hashlib.blake2b(repr((user_input, answer)).encode("utf-8"), digest_size=16)
+    digest.update(messages_repr.encode("utf-8"))
+    return digest.hexdigest()
+
+def generate_summary_from_messages(messages, user_input, answer):
+    """Generate a summary based on the conversation messages history."""
+    try:
+        # 历史记录只序列化一次，长度检查和缓存键共用
+        messages_repr = repr(messages) if messages else ""
+        if len(messages_repr) < MIN_REASONING_CHARS:
+            # 没有可概括的推理过程，无需调用模型
+            return f"\n\n### Conversation Summary ###\nQ: {user_input}\nA: {answer}\n\n"
+
+        cache_key = _summary_cache_key(messages_repr, user_input, answer)
+        cached_summary = _summary_cache.get(cache_key)
+        if cached_summary is not None:
+            _summary_cache.move_to_end(cache_key)
+            task_logger.info("使用缓存的会话概括")
+            return cached_summary
+
+        task_logger.info("正在生成会话消息历史的概括...")
+        question = user_input
+        answer = answer
+
+        # 默认值
+        default_summary = "No summary available."
+        reasoning = "No reasoning process provided."
+        
+        # # 初始化结构
+        # user_messages = []
+        # assistant_messages = []
+
+        # # 遍历消息历史
+        # for message in messages:
+        #     if message["role"] == "user":
+        #         user_messages.append(message["content"])
+        #     elif message["role"] == "assistant":
+        #         assistant_messages.append(message["content"])
+        
+        # # 处理用户消息和助手消息
+        # question = user_messages[-1] if user_messages else "Unknown question"
+        # answer = assistant_messages[-1] if assistant_messages else "Unknown answer"
+
+        # # 构造模型输入
+        # reasoning = "\n\n".join([f"User: {msg}" for msg in user_messages] + 
+        #                          [f"Assistant: {msg}" for msg in assistant_messages])
+        reasoning = messages
+        model = LiteLLMModel(
+            "gpt-4o",
+            custom_role_conversions={"tool-call": "assistant", "tool-response": "user"},
+            max_completion_tokens=16000,
+        )
+        
+        # 定义消息结构
+        messages_for_model = [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant summarizing a conversation history."
+            },
+            {
+                "role": "user",
+                "content": SUMMARY_PROMPT_TEMPLATE.format(question=question, answer=answer, reasoning=reasoning)
             }
         ]
 
@@ -112,13 +143,17 @@ Your report must be written clearly, sectioned by part, and all source citations
         summary = model(messages_for_model)
         summary_text = summary.content if hasattr(summary, 'content') else str(summary)
         task_logger.info("会话概括生成完成")
-        return f"\n\n### Conversation Summary ###\n{summary_text}\n\n"
+        result = f"\n\n### Conversation Summary ###\n{summary_text}\n\n"
+        _summary_cache[cache_key] = result
+        while len(_summary_cache) > SUMMARY_CACHE_MAX_ENTRIES:
+            _summary_cache.popitem(last=False)
+        return result
     except Exception as e:
         # 捕获错误并记录
         error_type = type(e).__name__
         error_msg = str(e)
-        import traceback
-        trace = traceback.format_exc()
-        task_logger.error(f"生成会话总结时出错: {error_type}: {error_msg}")
-        task_logger.debug(f"详细错误信息:\n{trace}")
+        task_logger.error("生成会话总结时出错: %s: %s", error_type, error_msg)
+        # 仅在开启 DEBUG 日志时才格式化完整堆栈
+        if task_logger.isEnabledFor(logging.DEBUG):
+            task_logger.debug("详细错误信息:\n%s", traceback.format_exc())
         return f"\n\n### Conversation Summary ###\nUnable to generate summary: {error_type}: {error_msg}\n\n"
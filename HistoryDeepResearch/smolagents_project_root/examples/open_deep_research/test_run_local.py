@@ -16,30 +16,47 @@ client = OpenAI(api_key=openai_api_key)
 # Agent creation
 from run_local import create_agent
 
+# Patterns for cleaning up captured agent output, compiled once
+ANSI_ESCAPE_PATTERN = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+COLOR_CODE_PATTERN = re.compile(r'\[.*?m')
+BRACKETED_PATTERN = re.compile(r'\[.*?\]')
+
+# Markdown, box-drawing and zero-width characters deleted from captured output in one translate pass
+MARKDOWN_CHARS_TABLE = str.maketrans('', '', ''.join([
+    '#', '*', '_', '`', '~', '-', '+', '>', '•',
+    '|', '│', '├', '─', '━', '═', '║', '╔', '╗', '╚', '╝',
+    '▌', '⠀', '⠅', '⣿', '\u200b', '\u200c', '\u200d', '\ufeff'
+]))
+
 class StreamCapture:
     def __init__(self, thinking_container):
         self.thinking_container = thinking_container
         with self.thinking_container:
             self.step_container = st.container()
         self.current_step = 0
+        # Raw writes of the line being printed, shown together once it ends
+        self._pending = []
 
     def clean_text(self, text):
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        cleaned = ansi_escape.sub('', text)
-        cleaned = re.sub(r'\[.*?m', '', cleaned)
-        markdown_chars = [
-            '#', '*', '_', '`', '~', '-', '+', '>', '•',
-            '|', '│', '├', '─', '━', '═', '║', '╔', '╗', '╚', '╝',
-            '▌', '⠀', '⠅', '⣿', '\u200b', '\u200c', '\u200d', '\ufeff'
-        ]
-        for char in markdown_chars:
-            cleaned = cleaned.replace(char, '')
-        cleaned = re.sub(r'\[.*?\]', '', cleaned)
-        cleaned = re.sub(r'\s+', ' ', cleaned)
-        return cleaned.strip()
+        cleaned = ANSI_ESCAPE_PATTERN.sub('', text)
+        cleaned = COLOR_CODE_PATTERN.sub('', cleaned)
+        cleaned = cleaned.translate(MARKDOWN_CHARS_TABLE)
+        cleaned = BRACKETED_PATTERN.sub('', cleaned)
+        # Collapse whitespace runs and trim the ends in one pass
+        return ' '.join(cleaned.split())
 
     def write(self, text):
-        clean_text = self.clean_text(text)
+        # print() sends its arguments, separators and end as separate writes; they are shown as one
+        # box once the line ends, and step and final answer markers are shown right away
+        self._pending.append(text)
+        if '\n' in text or "Step" in text or "Final answer" in text:
+            self._emit()
+
+    def _emit(self):
+        if not self._pending:
+            return
+        clean_text = self.clean_text("".join(self._pending))
+        self._pending = []
         if not clean_text:
             return
         if "Step" in clean_text:
@@ -73,6 +90,8 @@ if "messages" not in st.session_state:
     st.session_state["messages"] = [SYSTEM_PROMPT]
     st.session_state["file_content"] = None
 
+# The agent keeps its conversation memory and step logs, and so do its browser tools and managed
+# agents, so every session gets its own instead of one shared through st.cache_resource
 if "agent" not in st.session_state:
     st.session_state["agent"] = create_agent(model_id="gpt-4o")
 
@@ -94,24 +113,31 @@ for msg in st.session_state.messages[1:]:  # skip system prompt
 #     st.session_state["file_content"] = None
 
 import tempfile
+import shutil
 
 uploaded_file = st.file_uploader("📎 Upload any file (optional)", type=None)  # allow all file types
 if uploaded_file:
-    try:
-        # 保存上传的文件到临时目录
-        suffix = os.path.splitext(uploaded_file.name)[-1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            tmp_file.write(uploaded_file.getbuffer())
-            tmp_file_path = tmp_file.name
-
-        st.session_state["file_path"] = tmp_file_path
-        st.session_state["file_name"] = uploaded_file.name
-        st.toast(f"📄 File '{uploaded_file.name}' uploaded and saved to {tmp_file_path}")
-    except Exception as e:
-        st.warning(f"⚠️ Failed to save uploaded file: {e}")
-        st.session_state["file_path"] = None
-        st.session_state["file_name"] = None
+    # The uploader returns the same file on every rerun, so only save each upload once
+    if st.session_state.get("file_id") != uploaded_file.file_id:
+        try:
+            # 保存上传的文件到临时目录
+            suffix = os.path.splitext(uploaded_file.name)[-1]
+            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+                # Copy in 1 MB chunks so the write never needs a second full-size buffer
+                shutil.copyfileobj(uploaded_file, tmp_file, length=1024 * 1024)
+                tmp_file_path = tmp_file.name
+
+            st.session_state["file_id"] = uploaded_file.file_id
+            st.session_state["file_path"] = tmp_file_path
+            st.session_state["file_name"] = uploaded_file.name
+            st.toast(f"📄 File '{uploaded_file.name}' uploaded and saved to {tmp_file_path}")
+        except Exception as e:
+            st.warning(f"⚠️ Failed to save uploaded file: {e}")
+            st.session_state["file_id"] = None
+            st.session_state["file_path"] = None
+            st.session_state["file_name"] = None
 else:
+    st.session_state["file_id"] = None
     st.session_state["file_path"] = None
     st.session_state["file_name"] = None
 
@@ -145,6 +171,8 @@ if user_input := st.chat_input("Type your message here..."):
                 finally:
                     sys.stdout = old_stdout
                     sys.stderr = old_stderr
+                    # Show whatever the agent printed without a trailing newline
+                    stream_capture._emit()
 
             with st.chat_message("assistant"):
                 st.write(agent_response)
@@ -159,15 +187,16 @@ if user_input := st.chat_input("Type your message here..."):
                 f"The user has uploaded a file. Here is its content:\n\n"
                 f"{st.session_state['file_content']}\n\nUser's message: {user_input}"
             )
-        response = client.chat.completions.create(
+        # Stream the fallback answer so it shows up as soon as the first tokens arrive
+        response_stream = client.chat.completions.create(
             model="gpt-4o",
             messages=st.session_state.messages[-10:] + [{"role": "user", "content": context}],
             temperature=0.2,
+            stream=True,
         )
-        response_text = response.choices[0].message.content
 
         with st.chat_message("assistant"):
-            st.write(response_text)
+            response_text = st.write_stream(response_stream)
 
         st.session_state.messages.append({"role": "assistant", "content": response_text})
 